@@ -0,0 +1,66 @@
+import time
+import market_data
+
+
+class AccountSnapshot:
+    """
+    Cached view of an Upbit account for one trading cycle.
+    All balances come from a single upbit.get_balances() call and all KRW prices from
+    a single batched ticker request. Call invalidate() after an order fills; the next
+    read reloads both. `max_age` (seconds) bounds staleness for long-lived snapshots.
+    """
+
+    def __init__(self, upbit, coins=None, max_age=None):
+        self.upbit = upbit
+        self.coins = list(coins) if coins is not None else None
+        self.max_age = max_age
+        self._balances = None
+        self._prices = None
+        self._loaded_at = 0
+
+    def invalidate(self):
+        self._balances = None
+        self._prices = None
+
+    def _load(self):
+        if self._balances is not None:
+            if self.max_age is None or time.monotonic() - self._loaded_at < self.max_age:
+                return
+        self._loaded_at = time.monotonic()
+        self._balances = {b['currency']: b for b in self.upbit.get_balances()}
+        coins = self.coins if self.coins is not None else [c for c in self._balances if c != 'KRW']
+        self._prices = {}
+        tickers = [f"KRW-{coin}" for coin in coins]
+        if tickers:
+            try:
+                prices = market_data.get_prices(tickers)
+                self._prices = {ticker.split('-')[1]: price for ticker, price in prices.items()}
+            except Exception as e:
+                print(f"Failed to fetch current prices for {tickers}: {e}")
+
+    def balances(self):
+        self._load()
+        return list(self._balances.values())
+
+    def balance(self, currency):
+        self._load()
+        balance_info = self._balances.get(currency)
+        return float(balance_info['balance']) if balance_info else 0.0
+
+    def avg_buy_price(self, currency):
+        self._load()
+        balance_info = self._balances.get(currency)
+        return float(balance_info['avg_buy_price']) if balance_info else 0.0
+
+    def price(self, coin):
+        self._load()
+        return self._prices.get(coin)
+
+    def coin_value(self, coin):
+        price = self.price(coin)
+        return self.balance(coin) * price if price is not None else 0.0
+
+    def total_coin_value(self, coins=None):
+        self._load()
+        coins = coins if coins is not None else list(self._prices)
+        return sum(self.coin_value(coin) for coin in coins)
@@ -0,0 +1,81 @@
+import os
+import json
+from dataclasses import dataclass, field
+import pyupbit
+import decision_store
+from order_tracker import OrderTracker
+from price_guard import PriceGuard
+from slack_notifier import SlackNotifier
+
+ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", "accounts.json")
+SLACK_CHANNEL = "#coinautotade"
+
+
+@dataclass
+class Account:
+    """
+    One trading account: its exchange client, order tracker, decisions database, Slack
+    destination and fast-loop guard. Market data is not per account; a runner fetches it
+    once per cycle and hands the same snapshot to every account.
+    """
+    name: str
+    upbit: object
+    order_tracker: OrderTracker
+    slack_channel: str = SLACK_CHANNEL
+    db_path: str = decision_store.DB_PATH
+    notifier: SlackNotifier = None  # None: the process-wide notifier
+    guard: PriceGuard = field(default_factory=PriceGuard)
+
+
+def _secret(config, key):
+    # Keys can be given inline or, preferably, as the name of an environment variable
+    if config.get(key):
+        return config[key]
+    if config.get(f"{key}_env"):
+        return os.getenv(config[f"{key}_env"])
+    return None
+
+
+def load_accounts(path=ACCOUNTS_FILE):
+    """
+    Reads a JSON list of account configurations, e.g.
+
+        [{"name": "main", "access_key_env": "UPBIT_ACCESS_KEY", "secret_key_env": "UPBIT_SECRET_KEY"},
+         {"name": "sub", "access_key_env": "UPBIT_ACCESS_KEY_SUB", "secret_key_env": "UPBIT_SECRET_KEY_SUB",
+          "slack_channel": "#coinautotade-sub", "slack_token_env": "SLACK_BOT_TOKEN_SUB"}]
+
+    db_path defaults to trading_decisions_<name>.sqlite so accounts never share history.
+    Accounts with the same Slack token share one notifier.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        configs = json.load(file)
+
+    accounts = []
+    notifiers = {}
+    for config in configs:
+        name = config.get('name')
+        if not name:
+            raise ValueError(f"Account configuration without a name in {path}: {config}")
+        if any(account.name == name for account in accounts):
+            raise ValueError(f"Duplicate account name in {path}: {name}")
+        access_key, secret_key = _secret(config, 'access_key'), _secret(config, 'secret_key')
+        if not access_key or not secret_key:
+            raise ValueError(f"Missing Upbit keys for account {name}")
+
+        notifier = None
+        slack_token = _secret(config, 'slack_token')
+        if slack_token:
+            if slack_token not in notifiers:
+                notifiers[slack_token] = SlackNotifier(slack_token)
+            notifier = notifiers[slack_token]
+
+        upbit = pyupbit.Upbit(access_key, secret_key)
+        accounts.append(Account(
+            name=name,
+            upbit=upbit,
+            order_tracker=OrderTracker(upbit, max_workers=4),
+            slack_channel=config.get('slack_channel', SLACK_CHANNEL),
+            db_path=config.get('db_path', f"trading_decisions_{name}.sqlite"),
+            notifier=notifier,
+        ))
+    return accounts
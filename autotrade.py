@@ -1,339 +1,20 @@
-<<<<<<< Updated upstream
-import os
-from dotenv import load_dotenv
-import pyupbit
-import pandas as pd
-import pandas_ta as ta
-import json
-from openai import OpenAI
-import schedule
-import time
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
-
-
-# Load environment variables
-load_dotenv()
-
-
-# Setup
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-upbit = pyupbit.Upbit(os.getenv("UPBIT_ACCESS_KEY"), os.getenv("UPBIT_SECRET_KEY"))
-slack_client = WebClient(token=os.getenv('SLACK_BOT_TOKEN'))
-
-
-def send_slack_message(channel, message):
-    try:
-        slack_client.chat_postMessage(channel=channel, text=message)
-        print(f"{channel}에 메시지 전송 완료: {message}")
-    except SlackApiError as e:
-        print(f"슬랙 메시지 전송 실패: {e.response['error']}")
-
-
-
-def get_current_status(coins):
-    statuses = {}
-    balances = upbit.get_balances()
-    for coin in coins:
-        orderbook = pyupbit.get_orderbook(ticker=f"KRW-{coin}")
-        current_time = orderbook['timestamp']
-        balance_info = next((item for item in balances if item['currency'] == coin), None)
-        coin_balance = balance_info['balance'] if balance_info else 0
-        avg_buy_price = balance_info['avg_buy_price'] if balance_info else 0
-        statuses[coin] = {
-            'current_time': current_time,
-            'orderbook': orderbook,
-            'balance': coin_balance,
-            'avg_buy_price': avg_buy_price
-        }
-    return json.dumps(statuses)
-
-
-def fetch_and_prepare_data():
-    # Fetch data
-    df_daily = pyupbit.get_ohlcv("KRW-BTC", "day", count=30)
-    df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
-
-    # Define a helper function to add indicators
-    def add_indicators(df):
-        # Moving Averages
-        # Calculate and add SMAs for 3, 5, 10, and 20-day periods
-        df['SMA_3'] = ta.sma(df['close'], length=3)
-        df['SMA_5'] = ta.sma(df['close'], length=5)
-        df['SMA_10'] = ta.sma(df['close'], length=10)
-        df['SMA_20'] = ta.sma(df['close'], length=20)
-
-        # Calculate and add EMAs for 3, 5, 10, and 20-day periods
-        df['EMA_3'] = ta.ema(df['close'], length=3)
-        df['EMA_5'] = ta.ema(df['close'], length=5)
-        df['EMA_10'] = ta.ema(df['close'], length=10)
-        df['EMA_20'] = ta.ema(df['close'], length=20)
-
-        # df['SMA_10'] = ta.sma(df['close'], length=10)
-        # df['EMA_10'] = ta.ema(df['close'], length=10)
-
-        # RSI
-        df['RSI_14'] = ta.rsi(df['close'], length=14)
-
-        # Stochastic Oscillator
-        stoch = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
-        df = df.join(stoch)
-
-        # MACD
-        ema_fast = df['close'].ewm(span=12, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
-
-        # Bollinger Bands
-        df['Middle_Band'] = df['close'].rolling(window=20).mean()
-        # Calculate the standard deviation of closing prices over the last 20 days
-        std_dev = df['close'].rolling(window=20).std()
-        # Calculate the upper band (Middle Band + 2 * Standard Deviation)
-        df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
-        # Calculate the lower band (Middle Band - 2 * Standard Deviation)
-        df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
-
-        return df
-
-    # Add indicators to both dataframes
-    df_daily = add_indicators(df_daily)
-    df_hourly = add_indicators(df_hourly)
-
-    combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
-    combined_data = combined_df.to_json(orient='split')
-
-    # make combined data as string and print length
-    print(len(combined_data))
-
-    return json.dumps(combined_data)
-
-
-def get_instructions(file_path):
-    try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            instructions = file.read()
-        return instructions
-    except FileNotFoundError:
-        print("File not found.")
-    except Exception as e:
-        print("An error occurred while reading the file:", e)
-
-
-def analyze_data_with_gpt4(data_json):
-    instructions_path = "./instructions.md"  # Ensure correct path
-    try:
-        instructions = get_instructions(instructions_path)
-        if not instructions:
-            print("No instructions found.")
-            return None
-
-        coins = ["BTC", "SOL", "SHIB"]
-        current_status = get_current_status(coins)  # Now passing coins list
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": instructions},
-                {"role": "user", "content": data_json},
-                {"role": "user", "content": current_status}
-            ],
-            response_format={"type":"json_object"}
-        )
-        # Print the response content to console
-        # print("OpenAI GPT-4 Response:")
-        # print(response)
-        advice = json.loads(response.choices[0].message.content)
-        print(advice)
-        # Assuming advice structure is as provided in your example
-        decisions = advice.get("decisions", {})
-        investment_strategy = advice.get("investment_strategy", {})
-        buying_ratios = investment_strategy.get("buying_ratios", {})
-        
-        # Normalize buying_ratios from percentages to decimals for computation
-        for coin, ratio in buying_ratios.items():
-            buying_ratios[coin] = float(ratio.strip('%')) / 100
-        return decisions, buying_ratios
-    except Exception as e:
-        error_message = f"Error in analyzing data with GPT-4: {e}"
-        print(error_message)
-        print(f"Response content: {response.content}")
-        send_slack_message('#coinautotade', error_message)  # Ensure the correct channel name
-        return {}, {}
-
-
-def calculate_total_krw_value(coins):
-    total_krw_value = 0
-    for coin in coins:
-        coin_balance = upbit.get_balance(coin)
-        current_price = pyupbit.get_current_price(f"KRW-{coin}")
-        krw_value = coin_balance * current_price
-        total_krw_value += krw_value
-    return total_krw_value
-
-def make_decision_and_execute():
-    print("의사 결정을 내리고 실행 중...")
-    coins = ["BTC", "SOL", "SHIB"]
-    data_json = fetch_and_prepare_data()  # 분석에 필요한 데이터를 제공한다고 가정합니다.
-    decisions, buying_ratios = analyze_data_with_gpt4(data_json)
-
-    # 총 투자 가능 금액 계산
-    total_investment_amount = get_total_investment_amount()
-
-    # 거래 전 KRW 잔액과 총 가치 기록
-    krw_balance_before_trading = upbit.get_balance("KRW")
-    coin_value_before_trading = calculate_total_krw_value(coins)
-    total_value_before_trading = krw_balance_before_trading + coin_value_before_trading
-
-    total_fees = 0  # 총 수수료 초기화
-
-    for coin in coins:
-        decision = decisions.get(coin, {}).get('decision', 'hold')
-        reason = decisions.get(coin, {}).get('reason', '')
-        ratio = buying_ratios.get(coin, 0)
-        
-        # 현재 잔액 확인 및 목표 잔액 계산
-        coin_balance = upbit.get_balance(coin)
-        current_price = pyupbit.get_current_price(f"KRW-{coin}")
-        
-        target_balance_krw = total_investment_amount * ratio
-        target_balance = target_balance_krw / current_price
-        
-        if decision == 'buy':
-            if coin_balance < target_balance:
-                amount_to_invest = (target_balance - coin_balance) * current_price
-                result = execute_buy(coin, amount_to_invest, reason)
-                if result:
-                    total_fees += result['reserved_fee']  # 수수료 누적
-            else:
-                print(f"{coin}의 잔액이 충분하므로 매수를 건너뜁니다.")
-        elif decision == 'sell' and coin_balance > 0:
-            result = execute_sell(coin, reason)
-            if result:
-                total_fees += result['reserved_fee']  # 수수료 누적
-        else:
-            print(f"{coin} 보유 중: {reason}")
-
-    # 거래 후 KRW 잔액과 총 가치 기록
-    krw_balance_after_trading = upbit.get_balance("KRW")
-    coin_value_after_trading = calculate_total_krw_value(coins)
-    total_value_after_trading = krw_balance_after_trading + coin_value_after_trading
-
-    # 수익금과 수익률 계산
-    profit = total_value_after_trading - total_value_before_trading - total_fees
-    profit_ratio = (profit / total_value_before_trading) * 100
-
-    # 계산된 값을 슬랙 메시지로 전송
-    settlement_msg = f"거래 전 총 자산 가치(KRW): {total_value_before_trading:,.0f}, 거래 후 총 자산 가치(KRW): {total_value_after_trading:,.0f}, 총 수수료(KRW): {total_fees:,.0f}, 수익금(KRW): {profit:,.0f}, 수익률(%): {profit_ratio:.2f}"
-    send_slack_message('#coinautotade', settlement_msg)
-
-
-def get_total_investment_amount():
-    # Fetch current KRW balance
-    krw_balance = upbit.get_balance("KRW")
-    
-    # List of coins to include in the total valuation
-    coins = ["BTC", "SOL", "SHIB"]
-    
-    # Initialize total KRW value of coin holdings
-    total_krw_value_of_coins = 0
-    
-    # Loop through each coin to calculate its KRW value and add it to the total
-    for coin in coins:
-        coin_balance = upbit.get_balance(coin)  # Get coin balance
-        current_price = pyupbit.get_current_price(f"KRW-{coin}")  # Get current KRW price of the coin
-        krw_value = coin_balance * current_price  # Calculate KRW value of holdings
-        total_krw_value_of_coins += krw_value  # Add to total KRW value of coin holdings
-    
-    # Calculate total investment amount as 100% of the sum of KRW balance and total KRW value of coin holdings
-    total_investment_amount = (krw_balance + total_krw_value_of_coins) * 1.00  # 100% of total value
-    
-    return total_investment_amount
-
-
-def execute_buy(coin, amount, reason):
-    if amount < 5000:
-        print(f"{coin} 매수 금액이 최소 거래 금액인 5000 KRW 미만입니다. 건너뜁니다.")
-        return None
-    
-    try:
-        print(f"{amount:,.0f} KRW 만큼 {coin} 매수 시도 중. 이유: {reason}")
-        result = upbit.buy_market_order(f"KRW-{coin}", amount)
-        
-        # 주문 결과 확인
-        order_id = result['uuid']
-        order_info = upbit.get_order(order_id)
-        if order_info is not None and order_info['state'] == 'done':
-            message = f"{coin} 매수 주문 성공: 사용된 KRW 잔액: {order_info['price']:,.0f}, 매수한 코인 수량: {order_info['executed_volume']:.6f}, 수수료: {order_info['paid_fee']:,.0f}"
-            print(message)
-            send_slack_message('#coinautotade', message)
-        else:
-            error_message = f"{coin} 매수 주문이 완료되지 않았습니다. 주문 상태: {order_info['state'] if order_info is not None else 'Unknown'}"
-            print(error_message)
-            send_slack_message('#coinautotade', error_message)
-        
-        return order_info
-    except Exception as e:
-        error_message = f"{coin} 매수 주문 실패: {str(e)}"
-        print(error_message)
-        send_slack_message('#coinautotade', error_message)
-        return None
-
-def execute_sell(coin, reason):
-    coin_balance = upbit.get_balance(coin)
-    current_price = pyupbit.get_current_price(f"KRW-{coin}")
-    total_value = coin_balance * current_price
-    
-    if total_value < 5000:
-        print(f"{coin} 매도 금액이 최소 거래 금액인 5000 KRW 미만입니다. 건너뜁니다.")
-        return None
-    
-    try:
-        print(f"{coin} 보유량 전량 매도 시도 중. 이유: {reason}")
-        result = upbit.sell_market_order(f"KRW-{coin}", coin_balance)
-        
-        # 주문 결과 확인
-        order_id = result['uuid']
-        order_info = upbit.get_order(order_id)
-        if order_info is not None and order_info['state'] == 'done':
-            message = f"{coin} 매도 주문 성공: 매도한 코인 수량: {order_info['executed_volume']:.6f}, 받은 총 KRW: {order_info['price']:,.0f}, 수수료: {order_info['paid_fee']:,.0f}"
-            print(message)
-            send_slack_message('#coinautotade', message)
-        else:
-            error_message = f"{coin} 매도 주문이 완료되지 않았습니다. 주문 상태: {order_info['state'] if order_info is not None else 'Unknown'}"
-            print(error_message)
-            send_slack_message('#coinautotade', error_message)
-        
-        return order_info
-    except Exception as e:
-        error_message = f"{coin} 매도 주문 실패: {str(e)}"
-        print(error_message)
-        send_slack_message('#coinautotade', error_message)
-        return None
-
-
-if __name__ == "__main__":
-    make_decision_and_execute()  # Execute once immediately upon script start
-
-    # Schedule every 6 hours at 01 minute past the hour
-    # schedule.every().hour.at(":01").do(make_decision_and_execute)
-    schedule.every(6).hours.at(":01").do(make_decision_and_execute)
-
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-=======
 import os
 from dotenv import load_dotenv
 import pyupbit
-import pandas as pd
-import pandas_ta as ta
+import candle_store
+import market_data
+import ws_feed
+from account_snapshot import AccountSnapshot
+from valuation import Portfolio
+from order_tracker import OrderTracker
+from llm_backend import OpenAIClientBackend, get_backend
+import indicators
+import payload_encoder
 import json
 from openai import OpenAI
-import schedule
-import time
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+from scheduler import Scheduler, interval
+from datetime import datetime
+from slack_notifier import SlackNotifier
 
 
 # Load environment variables
@@ -343,23 +24,23 @@ load_dotenv()
 # Setup
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 upbit = pyupbit.Upbit(os.getenv("UPBIT_ACCESS_KEY"), os.getenv("UPBIT_SECRET_KEY"))
-slack_client = WebClient(token=os.getenv('SLACK_BOT_TOKEN'))
+slack_notifier = SlackNotifier()
+order_tracker = OrderTracker(upbit)
+llm_backend = get_backend(OpenAIClientBackend(client, model="gpt-4-turbo-preview"))
 
 
 def send_slack_message(channel, message):
-    try:
-        slack_client.chat_postMessage(channel=channel, text=message)
-        print(f"{channel}에 메시지 전송 완료: {message}")
-    except SlackApiError as e:
-        print(f"슬랙 메시지 전송 실패: {e.response['error']}")
+    # 백그라운드에서 사이클 단위로 묶어 전송하므로 매매 흐름을 막지 않습니다.
+    slack_notifier.notify(channel, message)
 
 
 
-def get_current_status(coins):
+def get_current_status(coins, account):
     statuses = {}
-    balances = upbit.get_balances()
+    balances = account.balances()
+    orderbooks = market_data.get_orderbooks([f"KRW-{coin}" for coin in coins])
     for coin in coins:
-        orderbook = pyupbit.get_orderbook(ticker=f"KRW-{coin}")
+        orderbook = orderbooks[f"KRW-{coin}"]
         current_time = orderbook['timestamp']
         balance_info = next((item for item in balances if item['currency'] == coin), None)
         coin_balance = balance_info['balance'] if balance_info else 0
@@ -375,63 +56,21 @@ def get_current_status(coins):
 
 def fetch_and_prepare_data():
     # Fetch data
-    df_daily = pyupbit.get_ohlcv("KRW-BTC", "day", count=30)
-    df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
-
-    # Define a helper function to add indicators
-    def add_indicators(df):
-        # Moving Averages
-        # Calculate and add SMAs for 3, 5, 10, and 20-day periods
-        df['SMA_3'] = ta.sma(df['close'], length=3)
-        df['SMA_5'] = ta.sma(df['close'], length=5)
-        df['SMA_10'] = ta.sma(df['close'], length=10)
-        df['SMA_20'] = ta.sma(df['close'], length=20)
-
-        # Calculate and add EMAs for 3, 5, 10, and 20-day periods
-        df['EMA_3'] = ta.ema(df['close'], length=3)
-        df['EMA_5'] = ta.ema(df['close'], length=5)
-        df['EMA_10'] = ta.ema(df['close'], length=10)
-        df['EMA_20'] = ta.ema(df['close'], length=20)
-
-        # df['SMA_10'] = ta.sma(df['close'], length=10)
-        # df['EMA_10'] = ta.ema(df['close'], length=10)
-
-        # RSI
-        df['RSI_14'] = ta.rsi(df['close'], length=14)
-
-        # Stochastic Oscillator
-        stoch = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
-        df = df.join(stoch)
-
-        # MACD
-        ema_fast = df['close'].ewm(span=12, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
-
-        # Bollinger Bands
-        df['Middle_Band'] = df['close'].rolling(window=20).mean()
-        # Calculate the standard deviation of closing prices over the last 20 days
-        std_dev = df['close'].rolling(window=20).std()
-        # Calculate the upper band (Middle Band + 2 * Standard Deviation)
-        df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
-        # Calculate the lower band (Middle Band - 2 * Standard Deviation)
-        df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
-
-        return df
+    df_daily = candle_store.get_ohlcv("KRW-BTC", "day", count=30)
+    df_hourly = candle_store.get_ohlcv("KRW-BTC", interval="minute60", count=24)
 
     # Add indicators to both dataframes
-    df_daily = add_indicators(df_daily)
-    df_hourly = add_indicators(df_hourly)
+    df_daily = indicators.add_indicators(df_daily, key=("KRW-BTC", "day"))
+    df_hourly = indicators.add_indicators(df_hourly, key=("KRW-BTC", "minute60"))
 
-    combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
-    combined_data = combined_df.to_json(orient='split')
+    payload = payload_encoder.encode_frames({'daily': df_daily, 'hourly': df_hourly})
+    combined_data = payload_encoder.dumps(payload)
 
-    # make combined data as string and print length
-    print(len(combined_data))
+    # print payload size
+    size_bytes, size_tokens = payload_encoder.payload_size(combined_data)
+    print(f"Market data payload: {size_bytes} bytes, ~{size_tokens} tokens")
 
-    return json.dumps(combined_data)
+    return combined_data
 
 
 def get_instructions(file_path):
@@ -445,8 +84,9 @@ def get_instructions(file_path):
         print("An error occurred while reading the file:", e)
 
 
-def analyze_data_with_gpt4(data_json):
+def analyze_data_with_gpt4(data_json, account):
     instructions_path = "./instructions.md"  # Ensure correct path
+    content = None
     try:
         instructions = get_instructions(instructions_path)
         if not instructions:
@@ -454,20 +94,16 @@ def analyze_data_with_gpt4(data_json):
             return None
 
         coins = ["BTC", "SOL", "SHIB"]
-        current_status = get_current_status(coins)  # Now passing coins list
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": instructions},
-                {"role": "user", "content": data_json},
-                {"role": "user", "content": current_status}
-            ],
-            response_format={"type":"json_object"}
-        )
+        current_status = get_current_status(coins, account)  # Now passing coins list
+        content = llm_backend.chat([
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": data_json},
+            {"role": "user", "content": current_status}
+        ])
         # Print the response content to console
         # print("OpenAI GPT-4 Response:")
-        # print(response)
-        advice = json.loads(response.choices[0].message.content)
+        # print(content)
+        advice = json.loads(content)
         print(advice)
         # Assuming advice structure is as provided in your example
         decisions = advice.get("decisions", {})
@@ -481,67 +117,72 @@ def analyze_data_with_gpt4(data_json):
     except Exception as e:
         error_message = f"Error in analyzing data with GPT-4: {e}"
         print(error_message)
-        print(f"Response content: {response.content}")
+        print(f"Response content: {content}")
         send_slack_message('#coinautotade', error_message)  # Ensure the correct channel name
         return {}, {}
 
 
-def calculate_total_krw_value(coins):
-    total_krw_value = 0
-    for coin in coins:
-        coin_balance = upbit.get_balance(coin)
-        current_price = pyupbit.get_current_price(f"KRW-{coin}")
-        krw_value = coin_balance * current_price
-        total_krw_value += krw_value
-    return total_krw_value
-
 def make_decision_and_execute():
     print("의사 결정을 내리고 실행 중...")
     coins = ["BTC", "SOL", "SHIB"]
-    data_json = fetch_and_prepare_data()  # 분석에 필요한 데이터를 제공한다고 가정합니다.
-    decisions, buying_ratios = analyze_data_with_gpt4(data_json)
-
-    # 총 투자 가능 금액 계산
-    total_investment_amount = get_total_investment_amount()
+    # 잔액과 현재가를 한 번에 조회해 이번 사이클 동안 공유합니다 (주문 체결 시에만 갱신).
+    account = AccountSnapshot(upbit, coins)
+
+    # 보유 수량과 현재가를 배열로 한 번에 평가합니다 (총 투자 가능 금액 = 총 자산의 100%).
+    portfolio = Portfolio.from_account(account, coins)
+    missing = portfolio.missing_prices()
+    if missing:
+        # 현재가 없이 평가하면 보유 코인이 0원으로 잡혀 과매수하게 되므로 이번 사이클은 거래하지 않습니다.
+        error_message = f"현재가를 조회하지 못해 이번 사이클의 거래를 건너뜁니다: {', '.join(missing)}"
+        print(error_message)
+        send_slack_message('#coinautotade', error_message)
+        slack_notifier.flush()
+        return
+    total_value_before_trading = portfolio.total
 
-    # 거래 전 KRW 잔액과 총 가치 기록
-    krw_balance_before_trading = upbit.get_balance("KRW")
-    coin_value_before_trading = calculate_total_krw_value(coins)
-    total_value_before_trading = krw_balance_before_trading + coin_value_before_trading
+    data_json = fetch_and_prepare_data()  # 분석에 필요한 데이터를 제공한다고 가정합니다.
+    decisions, buying_ratios = analyze_data_with_gpt4(data_json, account)
+    # 코인별 목표 비중까지 부족한 KRW 금액
+    shortfall = portfolio.shortfall(buying_ratios)
 
     total_fees = 0  # 총 수수료 초기화
+    pending_orders = []  # (coin, 체결 결과 Future) - 주문은 모두 넣은 뒤 체결을 한꺼번에 기다립니다.
 
     for coin in coins:
         decision = decisions.get(coin, {}).get('decision', 'hold')
         reason = decisions.get(coin, {}).get('reason', '')
-        ratio = buying_ratios.get(coin, 0)
-        
-        # 현재 잔액 확인 및 목표 잔액 계산
-        coin_balance = upbit.get_balance(coin)
-        current_price = pyupbit.get_current_price(f"KRW-{coin}")
-        
-        target_balance_krw = total_investment_amount * ratio
-        target_balance = target_balance_krw / current_price
-        
+        coin_balance = portfolio.quantity(coin)
+
         if decision == 'buy':
-            if coin_balance < target_balance:
-                amount_to_invest = (target_balance - coin_balance) * current_price
+            if shortfall[coin] > 0:
+                amount_to_invest = shortfall[coin]
                 result = execute_buy(coin, amount_to_invest, reason)
                 if result:
-                    total_fees += result['reserved_fee']  # 수수료 누적
+                    pending_orders.append((coin, result))
             else:
                 print(f"{coin}의 잔액이 충분하므로 매수를 건너뜁니다.")
         elif decision == 'sell' and coin_balance > 0:
-            result = execute_sell(coin, reason)
+            result = execute_sell(coin, reason, account)
             if result:
-                total_fees += result['reserved_fee']  # 수수료 누적
+                pending_orders.append((coin, result))
         else:
             print(f"{coin} 보유 중: {reason}")
 
-    # 거래 후 KRW 잔액과 총 가치 기록
-    krw_balance_after_trading = upbit.get_balance("KRW")
-    coin_value_after_trading = calculate_total_krw_value(coins)
-    total_value_after_trading = krw_balance_after_trading + coin_value_after_trading
+    for coin, result in pending_orders:
+        fill = report_fill(coin, result.result())
+        total_fees += fill.paid_fee  # 실제 체결 수수료 누적
+    if pending_orders:
+        account.invalidate()  # 체결로 잔액이 바뀌었으므로 정산 전에 스냅샷을 다시 불러옵니다.
+
+    # 거래 후 총 가치 기록
+    portfolio_after = Portfolio.from_account(account, coins)
+    if portfolio_after.missing_prices():
+        error_message = f"거래 후 현재가를 조회하지 못해 정산을 건너뜁니다: {', '.join(portfolio_after.missing_prices())}"
+        print(error_message)
+        send_slack_message('#coinautotade', error_message)
+        slack_notifier.flush()
+        return
+    total_value_after_trading = portfolio_after.total
 
     # 수익금과 수익률 계산
     profit = total_value_after_trading - total_value_before_trading - total_fees
@@ -550,29 +191,21 @@ def make_decision_and_execute():
     # 계산된 값을 슬랙 메시지로 전송
     settlement_msg = f"거래 전 총 자산 가치(KRW): {total_value_before_trading:,.0f}, 거래 후 총 자산 가치(KRW): {total_value_after_trading:,.0f}, 총 수수료(KRW): {total_fees:,.0f}, 수익금(KRW): {profit:,.0f}, 수익률(%): {profit_ratio:.2f}"
     send_slack_message('#coinautotade', settlement_msg)
+    # 이번 사이클의 알림을 한 번에 전송합니다.
+    slack_notifier.flush()
 
 
-def get_total_investment_amount():
-    # Fetch current KRW balance
-    krw_balance = upbit.get_balance("KRW")
-    
-    # List of coins to include in the total valuation
-    coins = ["BTC", "SOL", "SHIB"]
-    
-    # Initialize total KRW value of coin holdings
-    total_krw_value_of_coins = 0
-    
-    # Loop through each coin to calculate its KRW value and add it to the total
-    for coin in coins:
-        coin_balance = upbit.get_balance(coin)  # Get coin balance
-        current_price = pyupbit.get_current_price(f"KRW-{coin}")  # Get current KRW price of the coin
-        krw_value = coin_balance * current_price  # Calculate KRW value of holdings
-        total_krw_value_of_coins += krw_value  # Add to total KRW value of coin holdings
-    
-    # Calculate total investment amount as 100% of the sum of KRW balance and total KRW value of coin holdings
-    total_investment_amount = (krw_balance + total_krw_value_of_coins) * 1.00  # 100% of total value
-    
-    return total_investment_amount
+def report_fill(coin, fill):
+    if fill.executed_volume > 0 and fill.complete:
+        if fill.side == 'bid':
+            message = f"{coin} 매수 주문 성공: 사용된 KRW 잔액: {fill.funds:,.0f}, 매수한 코인 수량: {fill.executed_volume:.6f}, 평균 체결가: {fill.avg_price:,.2f}, 수수료: {fill.paid_fee:,.0f}"
+        else:
+            message = f"{coin} 매도 주문 성공: 매도한 코인 수량: {fill.executed_volume:.6f}, 받은 총 KRW: {fill.funds:,.0f}, 평균 체결가: {fill.avg_price:,.2f}, 수수료: {fill.paid_fee:,.0f}"
+    else:
+        message = f"{coin} 주문이 완료되지 않았습니다. 주문 상태: {fill.state}, 체결 수량: {fill.executed_volume:.6f}"
+    print(message)
+    send_slack_message('#coinautotade', message)
+    return fill
 
 
 def execute_buy(coin, amount, reason):
@@ -583,29 +216,21 @@ def execute_buy(coin, amount, reason):
     try:
         print(f"{amount:,.0f} KRW 만큼 {coin} 매수 시도 중. 이유: {reason}")
         result = upbit.buy_market_order(f"KRW-{coin}", amount)
-        
-        # 주문 결과 확인
-        order_id = result['uuid']
-        order_info = upbit.get_order(order_id)
-        if order_info is not None and order_info['state'] == 'done':
-            message = f"{coin} 매수 주문 성공: 사용된 KRW 잔액: {order_info['price']:,.0f}, 매수한 코인 수량: {order_info['executed_volume']:.6f}, 수수료: {order_info['paid_fee']:,.0f}"
-            print(message)
-            send_slack_message('#coinautotade', message)
-        else:
-            error_message = f"{coin} 매수 주문이 완료되지 않았습니다. 주문 상태: {order_info['state'] if order_info is not None else 'Unknown'}"
-            print(error_message)
-            send_slack_message('#coinautotade', error_message)
-        
-        return order_info
+
+        # 체결 결과는 백그라운드에서 조회하고, 호출한 쪽에서 Future로 받습니다.
+        return order_tracker.track(result['uuid'])
     except Exception as e:
         error_message = f"{coin} 매수 주문 실패: {str(e)}"
         print(error_message)
         send_slack_message('#coinautotade', error_message)
         return None
 
-def execute_sell(coin, reason):
-    coin_balance = upbit.get_balance(coin)
-    current_price = pyupbit.get_current_price(f"KRW-{coin}")
+def execute_sell(coin, reason, account):
+    coin_balance = account.balance(coin)
+    current_price = account.price(coin)
+    if current_price is None:
+        print(f"{coin} 현재가를 알 수 없어 매도를 건너뜁니다.")
+        return None
     total_value = coin_balance * current_price
     
     if total_value < 5000:
@@ -615,20 +240,9 @@ def execute_sell(coin, reason):
     try:
         print(f"{coin} 보유량 전량 매도 시도 중. 이유: {reason}")
         result = upbit.sell_market_order(f"KRW-{coin}", coin_balance)
-        
-        # 주문 결과 확인
-        order_id = result['uuid']
-        order_info = upbit.get_order(order_id)
-        if order_info is not None and order_info['state'] == 'done':
-            message = f"{coin} 매도 주문 성공: 매도한 코인 수량: {order_info['executed_volume']:.6f}, 받은 총 KRW: {order_info['price']:,.0f}, 수수료: {order_info['paid_fee']:,.0f}"
-            print(message)
-            send_slack_message('#coinautotade', message)
-        else:
-            error_message = f"{coin} 매도 주문이 완료되지 않았습니다. 주문 상태: {order_info['state'] if order_info is not None else 'Unknown'}"
-            print(error_message)
-            send_slack_message('#coinautotade', error_message)
-        
-        return order_info
+
+        # 체결 결과는 백그라운드에서 조회하고, 호출한 쪽에서 Future로 받습니다.
+        return order_tracker.track(result['uuid'])
     except Exception as e:
         error_message = f"{coin} 매도 주문 실패: {str(e)}"
         print(error_message)
@@ -637,13 +251,11 @@ def execute_sell(coin, reason):
 
 
 if __name__ == "__main__":
+    if ws_feed.MARKET_FEED == "websocket":
+        ws_feed.start_feed([f"KRW-{coin}" for coin in ["BTC", "SOL", "SHIB"]])
     make_decision_and_execute()  # Execute once immediately upon script start
 
-    # Schedule every 6 hours at 01 minute past the hour
-    # schedule.every().hour.at(":01").do(make_decision_and_execute)
-    schedule.every(6).hours.at(":01").do(make_decision_and_execute)
-
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
->>>>>>> Stashed changes
+    # Schedule every 6 hours at 01 minute past the hour (00:01, 06:01, 12:01, 18:01)
+    scheduler = Scheduler()
+    scheduler.add_job(make_decision_and_execute, interval(6 * 3600, anchor=datetime.now().replace(hour=0, minute=1, second=0, microsecond=0)))
+    scheduler.run_forever()
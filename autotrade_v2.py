@@ -2,69 +2,97 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 import pyupbit
-import pandas as pd
-import pandas_ta as ta
+import candle_store
+import decision_store
+import market_data
+import ws_feed
+import indicators
+import payload_encoder
+from prompt_budget import PromptSection, build_messages
+from llm_cache import ResponseCache
+from json_stream import ObjectStreamParser
+from llm_backend import LLMBackendError, OpenAIChatCompletionBackend, get_backend
 import json
-import schedule
+from scheduler import Scheduler, interval, daily_at
+from price_guard import PriceGuard, FAST_LOOP_INTERVAL
+from order_tracker import OrderTracker, ORDER_POLL_TIMEOUT
 import time
 import requests
 from datetime import datetime
-import sqlite3
 import argparse
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from dataclasses import dataclass
+from slack_notifier import SlackNotifier
+from accounts import Account, load_accounts, ACCOUNTS_FILE
 import openai
 
 # Setup
 openai.api_key = os.getenv("OPENAI_API_KEY")
 upbit = pyupbit.Upbit(os.getenv("UPBIT_ACCESS_KEY"), os.getenv("UPBIT_SECRET_KEY"))
-slack_client = WebClient(token=os.getenv('SLACK_BOT_TOKEN'))
-
-def send_slack_message(channel, message, order_info=None, coin=None, is_buy=True):
-    try:
-        if order_info and coin:
-            if is_buy:
-                message_str = f"{coin} 매수 주문 성공: 사용된 KRW 잔액: {str(order_info['price'])}, 매수한 코인 수량: {str(order_info['executed_volume'])}, 수수료: {str(order_info['reserved_fee'])}"
-            else:
-                message_str = f"{coin} 매도 주문 성공: 매도한 코인 수량: {str(order_info['executed_volume'])}"
+slack_notifier = SlackNotifier()
+order_tracker = OrderTracker(upbit)
+response_cache = ResponseCache()
+llm_backend = get_backend(OpenAIChatCompletionBackend(model="gpt-4o"))
+price_guard = PriceGuard()
+# The account configured through UPBIT_ACCESS_KEY/UPBIT_SECRET_KEY; --accounts runs several instead
+default_account = Account(name="default", upbit=upbit, order_tracker=order_tracker, guard=price_guard)
+
+TICKERS = ["KRW-BTC", "KRW-SOL", "KRW-XRP"]
+ACCOUNT_WORKERS = int(os.getenv("ACCOUNT_WORKERS", "4"))  # accounts analysed/traded at the same time
+
+# Per-source timeouts (seconds) for the concurrent gather stage
+SOURCE_TIMEOUTS = {
+    'news': 15,
+    'fear_and_greed': 10,
+    'market_data': 30,
+    'last_decisions': 5,
+    'balances': 10,
+    'orderbooks': 10,
+}
+SOURCE_PLACEHOLDERS = {
+    'news': [],
+    'fear_and_greed': "No fear and greed data available.",
+    'last_decisions': "No decisions found.",
+}
+
+@dataclass
+class MarketSnapshot:
+    news_data: list
+    fear_and_greed: str
+    data_json: dict
+    last_decisions: dict
+    current_status: dict
+    prices: dict
+
+def send_slack_message(channel, message, fill=None, coin=None, is_buy=True, notifier=None):
+    if fill and coin:
+        if not fill.complete or fill.executed_volume == 0:
+            message_str = f"{coin} 주문이 완료되지 않았습니다. 주문 상태: {fill.state}, 체결 수량: {fill.executed_volume}"
+        elif is_buy:
+            message_str = f"{coin} 매수 주문 성공: 사용된 KRW 잔액: {fill.funds:,.0f}, 매수한 코인 수량: {fill.executed_volume}, 평균 체결가: {fill.avg_price:,.2f}, 수수료: {fill.paid_fee:,.2f}"
         else:
-            message_str = str(message)
-        slack_client.chat_postMessage(channel=channel, text=message_str)
-        print(f"{channel}에 메시지 전송 완료: {message_str}")
-    except SlackApiError as e:
-        print(f"슬랙 메시지 전송 실패: {e.response['error']}")
-
-def initialize_db(db_path='trading_decisions.sqlite'):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS decisions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME,
-                ticker TEXT,
-                decision TEXT,
-                percentage REAL,
-                reason TEXT,
-                coin_balance REAL,
-                krw_balance REAL,
-                coin_avg_buy_price REAL,
-                coin_price REAL
-            );
-        ''')
-        conn.commit()
-
-def save_decision_to_db(ticker, decision, current_status):
-    db_path = 'trading_decisions.sqlite'
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-    
+            message_str = f"{coin} 매도 주문 성공: 매도한 코인 수량: {fill.executed_volume}, 받은 총 KRW: {fill.funds:,.0f}, 평균 체결가: {fill.avg_price:,.2f}, 수수료: {fill.paid_fee:,.2f}"
+    else:
+        message_str = str(message)
+    # 백그라운드에서 사이클 단위로 묶어 전송하므로 매매 흐름을 막지 않습니다.
+    (notifier or slack_notifier).notify(channel, message_str)
+
+def initialize_db(db_path=decision_store.DB_PATH):
+    # Opens the shared WAL-mode connection and migrates the schema/indexes in place
+    decision_store.get_connection(db_path)
+
+def record_decisions(decisions, current_status, prices, db_path=decision_store.DB_PATH):
+    """
+    Writes a whole cycle's decisions ({ticker: decision}) in a single transaction.
+    Prices come from the cycle's market snapshot, so recording makes no network calls.
+    """
+    timestamp = int(time.time() * 1000)  # epoch milliseconds
+    rows = []
+    for ticker, decision in decisions.items():
         # Parsing current_status from JSON to Python dict
-        status_dict = json.loads(current_status)
-        current_price = pyupbit.get_orderbook(ticker)['orderbook_units'][0]["ask_price"]
-        
-        # Preparing data for insertion
-        data_to_insert = (
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        status_dict = json.loads(current_status[ticker])
+        rows.append((
+            timestamp,
             ticker,
             decision.get('decision'),
             decision.get('percentage', 100),  # Defaulting to 100 if not provided
@@ -72,56 +100,43 @@ def save_decision_to_db(ticker, decision, current_status):
             status_dict.get('coin_balance'),
             status_dict.get('krw_balance'),
             status_dict.get('coin_avg_buy_price'),
-            current_price
-        )
-        
-        # Inserting data into the database
-        cursor.execute('''
+            prices.get(ticker)
+        ))
+
+    with decision_store.transaction(db_path) as conn:
+        conn.executemany('''
             INSERT INTO decisions (timestamp, ticker, decision, percentage, reason, coin_balance, krw_balance, coin_avg_buy_price, coin_price)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', data_to_insert)
-    
-        conn.commit()
-
-def fetch_last_decisions(ticker, db_path='trading_decisions.sqlite', num_decisions=10):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, decision, percentage, reason, coin_balance, krw_balance, coin_avg_buy_price FROM decisions
-            WHERE ticker = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (ticker, num_decisions))
-        decisions = cursor.fetchall()
-
-        if decisions:
-            formatted_decisions = []
-            for decision in decisions:
-                # Converting timestamp to milliseconds since the Unix epoch
-                ts = datetime.strptime(decision[0], "%Y-%m-%d %H:%M:%S")
-                ts_millis = int(ts.timestamp() * 1000)
-                
-                formatted_decision = {
-                    "timestamp": ts_millis,
-                    "decision": decision[1],
-                    "percentage": decision[2],
-                    "reason": decision[3],
-                    "coin_balance": decision[4],
-                    "krw_balance": decision[5],
-                    "coin_avg_buy_price": decision[6]
-                }
-                formatted_decisions.append(str(formatted_decision))
-            return "\n".join(formatted_decisions)
-        else:
-            return "No decisions found."
+        ''', rows)
+
+def fetch_last_decisions(ticker, db_path=decision_store.DB_PATH, num_decisions=10):
+    # Served by idx_decisions_ticker_timestamp; each row comes back as a ready-made JSON line
+    decisions = decision_store.query('''
+        SELECT json_object(
+            'timestamp', timestamp, 'decision', decision, 'percentage', percentage, 'reason', reason,
+            'coin_balance', coin_balance, 'krw_balance', krw_balance, 'coin_avg_buy_price', coin_avg_buy_price
+        ) FROM decisions
+        WHERE ticker = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    ''', (ticker, num_decisions), db_path)
+
+    if decisions:
+        return "\n".join(row[0] for row in decisions)
+    else:
+        return "No decisions found."
 
-def get_current_status(ticker):
-    orderbook = pyupbit.get_orderbook(ticker)
+def get_current_status(ticker, account=None, balances=None, orderbook=None):
+    """balances / orderbook: already fetched data to reuse, so several tickers can share one request."""
+    account = account or default_account
+    if orderbook is None:
+        orderbook = market_data.get_orderbook(ticker)
     current_time = orderbook['timestamp']
     coin_balance = 0
     krw_balance = 0
     coin_avg_buy_price = 0
-    balances = upbit.get_balances()
+    if balances is None:
+        balances = account.upbit.get_balances()
     for b in balances:
         if b['currency'] == ticker.split('-')[1]:
             coin_balance = b['balance']
@@ -132,67 +147,28 @@ def get_current_status(ticker):
     current_status = {'current_time': current_time, 'orderbook': orderbook, 'coin_balance': coin_balance, 'krw_balance': krw_balance, 'coin_avg_buy_price': coin_avg_buy_price}
     return json.dumps(current_status)
 
-def fetch_and_prepare_data(ticker):
+def prepare_frames(ticker):
     # Fetch data
-    df_daily = pyupbit.get_ohlcv(ticker, "day", count=30)
-    df_hourly = pyupbit.get_ohlcv(ticker, interval="minute60", count=24)
-
-    # Define a helper function to add indicators
-    def add_indicators(df):
-        # Moving Averages
-        df['SMA_3'] = ta.sma(df['close'], length=3)
-        df['SMA_5'] = ta.sma(df['close'], length=5)
-        df['SMA_10'] = ta.sma(df['close'], length=10)
-        df['SMA_20'] = ta.sma(df['close'], length=20)
-
-        # Calculate and add EMAs for 3, 5, 10, and 20-day periods
-        df['EMA_3'] = ta.ema(df['close'], length=3)
-        df['EMA_5'] = ta.ema(df['close'], length=5)
-        df['EMA_10'] = ta.ema(df['close'], length=10)
-        df['EMA_20'] = ta.ema(df['close'], length=20)
-
-        # RSI
-        df['RSI_14'] = ta.rsi(df['close'], length=14)
-
-        # Stochastic Oscillator
-        stoch = ta.stoch(df['high'], df['low'], df['close'], k=14, d=3, smooth_k=3)
-        df = df.join(stoch)
-
-        # MACD
-        ema_fast = df['close'].ewm(span=12, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema_fast - ema_slow
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Histogram'] = df['MACD'] - df['Signal_Line']
-
-        # Bollinger Bands
-        df['Middle_Band'] = df['close'].rolling(window=20).mean()
-        # Calculate the standard deviation of closing prices over the last 20 days
-        std_dev = df['close'].rolling(window=20).std()
-        # Calculate the upper band (Middle Band + 2 * Standard Deviation)
-        df['Upper_Band'] = df['Middle_Band'] + (std_dev * 2)
-        # Calculate the lower band (Middle Band - 2 * Standard Deviation)
-        df['Lower_Band'] = df['Middle_Band'] - (std_dev * 2)
-
-        return df
+    df_daily = candle_store.get_ohlcv(ticker, "day", count=30)
+    df_hourly = candle_store.get_ohlcv(ticker, interval="minute60", count=24)
 
     # Add indicators to both dataframes
-    df_daily = add_indicators(df_daily)
-    df_hourly = add_indicators(df_hourly)
+    df_daily = indicators.add_indicators(df_daily, key=(ticker, "day"))
+    df_hourly = indicators.add_indicators(df_hourly, key=(ticker, "minute60"))
 
-    combined_df = pd.concat([df_daily, df_hourly], keys=['daily', 'hourly'])
-    combined_data = combined_df.to_json(orient='split')
+    return {'daily': df_daily, 'hourly': df_hourly}
 
-    return json.dumps(combined_data)
+def fetch_and_prepare_data(ticker):
+    return payload_encoder.encode_frames(prepare_frames(ticker))
 
 def get_news_data():
     ### Get news data from SERPAPI
     url = "https://serpapi.com/search.json?engine=google_news&q=btc+or+sol+or+xrp&api_key=" + os.getenv("SERPAPI_API_KEY")
 
-    result = "No news data available."
+    result = []
 
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=SOURCE_TIMEOUTS['news'])
         news_results = response.json()['news_results']
 
         simplified_news = []
@@ -210,7 +186,7 @@ def get_news_data():
                     simplified_news.append((news_item['title'], news_item.get('source', {}).get('name', 'Unknown source'), timestamp))
                 else:
                     simplified_news.append((news_item['title'], news_item.get('source', {}).get('name', 'Unknown source'), 'No timestamp provided'))
-        result = str(simplified_news)
+        result = simplified_news
     except Exception as e:
         print(f"Error fetching news data: {e}")
 
@@ -223,7 +199,7 @@ def fetch_fear_and_greed_index(limit=1, date_format=''):
     - limit (int): Number of results to return. Default is 1.
     - date_format (str): Date format ('us', 'cn', 'kr', 'world'). Default is '' (unixtime).
     Returns:
-    - dict or str: The Fear and Greed Index data in the specified format.
+    - str: The Fear and Greed Index entries as a JSON array.
     """
     base_url = "https://api.alternative.me/fng/"
     params = {
@@ -231,12 +207,10 @@ def fetch_fear_and_greed_index(limit=1, date_format=''):
         'format': 'json',
         'date_format': date_format
     }
-    response = requests.get(base_url, params=params)
+    response = requests.get(base_url, params=params, timeout=SOURCE_TIMEOUTS['fear_and_greed'])
     myData = response.json()['data']
-    resStr = ""
-    for data in myData:
-        resStr += str(data)
-    return resStr
+    # JSON rather than dict reprs, so the response cache can parse it and drop the update countdown
+    return json.dumps(myData)
 
 def get_instructions(file_path):
     try:
@@ -248,128 +222,364 @@ def get_instructions(file_path):
     except Exception as e:
         print("An error occurred while reading the file:", e)
 
+def format_news(news_data, limit=None, title_length=None):
+    if not news_data:
+        return "No news data available."
+    # Newest first, so dropping items removes the oldest news
+    news = sorted(news_data, key=lambda item: item[2] if isinstance(item[2], int) else 0, reverse=True)
+    if limit:
+        news = news[:limit]
+    if title_length:
+        news = [(title[:title_length], source, timestamp) for title, source, timestamp in news]
+    return str(news)
+
+def build_prompt_sections(news_data, data_json, last_decisions, fear_and_greed, current_status):
+    """
+    Prompt sections in message order. Lower priority is trimmed first:
+    news -> fear and greed -> previous decisions -> older market bars; current status is never trimmed.
+    """
+    def market_data_section(hourly=None, daily=None):
+        payloads = {}
+        for ticker, payload in data_json.items():
+            if hourly is not None:
+                payload = payload_encoder.trim_payload(payload, 'hourly', hourly)
+            if daily is not None:
+                payload = payload_encoder.trim_payload(payload, 'daily', daily)
+            payloads[ticker] = payload
+        return payload_encoder.dumps(payloads)
+
+    def previous_decisions(limit):
+        return json.dumps({ticker: "\n".join(decisions.split("\n")[:limit]) for ticker, decisions in last_decisions.items()})
+
+    return [
+        PromptSection('news', [
+            lambda: format_news(news_data),
+            lambda: format_news(news_data, title_length=60),
+            lambda: format_news(news_data, limit=10, title_length=60),
+            "No news data available.",
+        ], priority=1),
+        PromptSection('market_data', [
+            lambda: market_data_section(),
+            lambda: market_data_section(hourly=12),
+            lambda: market_data_section(hourly=6, daily=20),
+        ], priority=4),
+        PromptSection('last_decisions', [
+            lambda: json.dumps(last_decisions),
+            lambda: previous_decisions(5),
+            lambda: previous_decisions(2),
+        ], priority=3),
+        PromptSection('fear_and_greed', [fear_and_greed, "No fear and greed data available."], priority=2),
+        PromptSection('current_status', [json.dumps(current_status)], priority=5),
+    ]
+
 def analyze_data_with_gpt4(news_data, data_json, last_decisions, fear_and_greed, current_status):
+    """
+    Streams the GPT-4 response and yields (ticker, decision) pairs as soon as each one is complete.
+    Raises ValueError (after closing the stream) as soon as the output stops being valid JSON.
+    """
     instructions_path = "instructions_v2.md"
     try:
         instructions = get_instructions(instructions_path)
         if not instructions:
             print("No instructions found.")
-            return None
-
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": instructions},
-                {"role": "user", "content": news_data},
-                {"role": "user", "content": data_json},
-                {"role": "user", "content": last_decisions},
-                {"role": "user", "content": fear_and_greed},
-                {"role": "user", "content": current_status}
-            ],
-            response_format={"type":"json_object"}
-        )
-        advice = response.choices[0].message.content
-        return advice
-    except openai.error.OpenAIError as e:
+            return
+
+        # Previous decisions are left out of the key: they only echo our own earlier answers
+        cache_key = response_cache.key(instructions, news_data, data_json, fear_and_greed, current_status)
+        advice = response_cache.get(cache_key)
+        if advice is not None:
+            print(f"Reusing cached GPT-4 response ({response_cache.stats()})")
+            yield from json.loads(advice).items()
+            return
+
+        sections = build_prompt_sections(news_data, data_json, last_decisions, fear_and_greed, current_status)
+        messages, _ = build_messages(instructions, sections)
+        chunks = llm_backend.stream_chat(messages)
+        parser = ObjectStreamParser()
+        try:
+            for content in chunks:
+                yield from parser.feed(content)
+            advice = parser.finish()
+        finally:
+            chunks.close()
+        response_cache.put(cache_key, advice)
+        print(f"GPT-4 response cache: {response_cache.stats()}")
+    except LLMBackendError as e:
         print(f"Error in analyzing data with GPT-4: {e}")
-        return None
+        # Decisions may already have been yielded; let the caller retry the remaining tickers
+        raise ValueError(f"Response stream interrupted: {e}")
 
-def execute_buy(ticker, percentage):
+def execute_buy(ticker, percentage, account=None):
+    account = account or default_account
     print(f"Attempting to buy {ticker.split('-')[1]} with a percentage of KRW balance...")
     try:
-        krw_balance = upbit.get_balance("KRW")
+        krw_balance = account.upbit.get_balance("KRW")
         amount_to_invest = krw_balance * (percentage / 100)
         if amount_to_invest > 5000:  # Ensure the order is above the minimum threshold
-            result = upbit.buy_market_order(ticker, amount_to_invest * 0.9995)  # Adjust for fees
-            print("Buy order successful:", result)
-            send_slack_message('#coinautotade', "", order_info=result, coin=ticker.split('-')[1], is_buy=True)
+            result = account.upbit.buy_market_order(ticker, amount_to_invest * 0.9995)  # Adjust for fees
+            print("Buy order placed:", result)
+            # Report the actual fill once the order settles, without holding up the other tickers
+            return account.order_tracker.track(result['uuid'], on_fill=lambda fill: send_slack_message(
+                account.slack_channel, "", fill=fill, coin=ticker.split('-')[1], is_buy=True, notifier=account.notifier))
     except Exception as e:
         print(f"Failed to execute buy order: {e}")
-        send_slack_message('#coinautotade', str(e))
+        send_slack_message(account.slack_channel, str(e), notifier=account.notifier)
 
-def execute_sell(ticker, percentage):
+def execute_sell(ticker, percentage, account=None):
+    account = account or default_account
     print(f"Attempting to sell a percentage of {ticker.split('-')[1]}...")
     try:
-        coin_balance = upbit.get_balance(ticker.split('-')[1])
+        coin_balance = account.upbit.get_balance(ticker.split('-')[1])
         amount_to_sell = coin_balance * (percentage / 100)
-        current_price = pyupbit.get_orderbook(ticker=ticker)['orderbook_units'][0]["ask_price"]
+        current_price = market_data.get_ask_price(ticker)
         if current_price * amount_to_sell > 5000:  # Ensure the order is above the minimum threshold
-            result = upbit.sell_market_order(ticker, amount_to_sell)
-            print("Sell order successful:", result)
-            send_slack_message('#coinautotade', "", order_info=result, coin=ticker.split('-')[1], is_buy=False)
+            result = account.upbit.sell_market_order(ticker, amount_to_sell)
+            print("Sell order placed:", result)
+            return account.order_tracker.track(result['uuid'], on_fill=lambda fill: send_slack_message(
+                account.slack_channel, "", fill=fill, coin=ticker.split('-')[1], is_buy=False, notifier=account.notifier))
     except Exception as e:
         print(f"Failed to execute sell order: {e}")
-        send_slack_message('#coinautotade', str(e))
+        send_slack_message(account.slack_channel, str(e), notifier=account.notifier)
 
-def make_decision_and_execute():
-    print("Making decisions and executing for all tickers...")
+def gather_market_snapshots(accounts, tickers=TICKERS, max_workers=16):
+    """
+    Fetches every decision input concurrently: news, fear and greed, candles/indicators and
+    orderbooks once for all accounts, previous decisions per account and ticker, and one balance
+    snapshot per account; every ticker's status and price come from those orderbooks and balances.
+    Returns {account name: MarketSnapshot}; the shared inputs are the same objects in each.
+    Each source is given its own timeout (SOURCE_TIMEOUTS); optional sources fall back
+    to a placeholder, missing market data raises, and an account whose balances fail is
+    left out of this cycle.
+    """
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(tickers) * (1 + len(accounts)) + len(accounts) + 3))
     try:
-        news_data = get_news_data()
-        data_json = {
-            "KRW-BTC": fetch_and_prepare_data("KRW-BTC"),
-            "KRW-SOL": fetch_and_prepare_data("KRW-SOL"),
-            "KRW-XRP": fetch_and_prepare_data("KRW-XRP")
-        }
-        last_decisions = {
-            "KRW-BTC": fetch_last_decisions("KRW-BTC"),
-            "KRW-SOL": fetch_last_decisions("KRW-SOL"),
-            "KRW-XRP": fetch_last_decisions("KRW-XRP")
-        }
-        fear_and_greed = fetch_fear_and_greed_index(limit=30)
-        current_status = {
-            "KRW-BTC": get_current_status("KRW-BTC"),
-            "KRW-SOL": get_current_status("KRW-SOL"),
-            "KRW-XRP": get_current_status("KRW-XRP")
+        started = time.monotonic()
+        futures = {
+            ('news', None, None): executor.submit(get_news_data),
+            ('fear_and_greed', None, None): executor.submit(fetch_fear_and_greed_index, limit=30),
+            # Every orderbook in one request; statuses and recorded prices both come from it
+            ('orderbooks', None, None): executor.submit(market_data.get_orderbooks, tickers),
         }
+        for ticker in tickers:
+            futures[('market_data', None, ticker)] = executor.submit(fetch_and_prepare_data, ticker)
+            for account in accounts:
+                futures[('last_decisions', account.name, ticker)] = executor.submit(fetch_last_decisions, ticker, account.db_path)
+        for account in accounts:
+            futures[('balances', account.name, None)] = executor.submit(account.upbit.get_balances)
+
+        results = {}
+        for (source, name, ticker), future in futures.items():
+            remaining = max(started + SOURCE_TIMEOUTS[source] - time.monotonic(), 0)
+            try:
+                results[(source, name, ticker)] = future.result(timeout=remaining)
+            except Exception as e:
+                reason = "timed out" if isinstance(e, FutureTimeoutError) else str(e)
+                if source == 'balances':
+                    # One account's bad key or outage must not stop the others
+                    print(f"Balances for {name} failed ({reason}); skipping this account this cycle.")
+                    continue
+                if source in ('market_data', 'orderbooks'):
+                    raise RuntimeError(f"{source}{f' for {ticker}' if ticker else ''} failed: {reason}")
+                print(f"{source} {ticker or ''} unavailable ({reason}), using placeholder.")
+                results[(source, name, ticker)] = SOURCE_PLACEHOLDERS[source]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    accounts = [account for account in accounts if ('balances', account.name, None) in results]
+    if not accounts:
+        raise RuntimeError("No account's balances could be loaded.")
+    orderbooks = results[('orderbooks', None, None)]
+    missing = [ticker for ticker in tickers if ticker not in orderbooks]
+    if missing:
+        raise RuntimeError(f"orderbooks missing for {', '.join(missing)}")
+    prices = {ticker: orderbooks[ticker]['orderbook_units'][0]['ask_price'] for ticker in tickers}
+    data_json = {ticker: results[('market_data', None, ticker)] for ticker in tickers}
+    current_status = {
+        (account.name, ticker): get_current_status(ticker, account, results[('balances', account.name, None)], orderbooks[ticker])
+        for account in accounts for ticker in tickers
+    }
+    return {
+        account.name: MarketSnapshot(
+            news_data=results[('news', None, None)],
+            fear_and_greed=results[('fear_and_greed', None, None)],
+            data_json=data_json,
+            last_decisions={ticker: results[('last_decisions', account.name, ticker)] for ticker in tickers},
+            current_status={ticker: current_status[(account.name, ticker)] for ticker in tickers},
+            prices=prices,
+        )
+        for account in accounts
+    }
+
+def gather_market_snapshot(tickers=TICKERS, max_workers=16, account=None):
+    account = account or default_account
+    return gather_market_snapshots([account], tickers, max_workers)[account.name]
+
+def decide_and_execute(account, snapshot):
+    """Runs the LLM on one account's view of the snapshot, places its orders and records the decisions."""
+    max_retries = 5
+    decisions = {}  # tickers already acted on; a retry only fills in the rest
+    orders = []  # fills being tracked in the background
+    completed = False
+    for attempt in range(max_retries):
+        try:
+            for ticker, decision_data in analyze_data_with_gpt4(snapshot.news_data, snapshot.data_json, snapshot.last_decisions,
+                                                                snapshot.fear_and_greed, snapshot.current_status):
+                if not isinstance(decision_data, dict):
+                    raise ValueError(f"Decision for {ticker} is not an object: {decision_data!r}")
+                if ticker in decisions:
+                    continue
+                decisions[ticker] = decision_data
+                order = execute_decision(ticker, decision_data, account)
+                if order is not None:
+                    orders.append(order)
+            else:
+                completed = bool(decisions)
+            if completed:
+                break
+        except ValueError as e:
+            # Malformed output aborts the stream right away, so retry without waiting
+            print(f"JSON parsing failed: {e}. Retrying now...")
+            print(f"Attempt {attempt + 2} of {max_retries}")
+    if orders:
+        # All orders are in flight together; wait for their fills so the cycle's report is complete
+        wait(orders, timeout=ORDER_POLL_TIMEOUT + 5)
+    if decisions:
+        try:
+            record_decisions(decisions, snapshot.current_status, snapshot.prices, account.db_path)
+        except Exception as e:
+            print(f"Failed to save decisions to DB ({account.name}): {e}")
+    if not completed:
+        print(f"Failed to make a decision after maximum retries ({account.name}).")
+
+def flush_notifications(accounts):
+    # Post this cycle's notifications as one batch per notifier
+    for notifier in {id(n): n for n in [slack_notifier] + [account.notifier for account in accounts if account.notifier]}.values():
+        notifier.flush()
+
+def make_decision_and_execute(accounts=None):
+    accounts = accounts or [default_account]
+    print(f"Making decisions and executing for all tickers ({len(accounts)} account(s))...")
+    try:
+        started = time.monotonic()
+        # Market data and indicators are fetched once and shared by every account
+        snapshots = gather_market_snapshots(accounts)
+        print(f"Gathered market snapshot in {time.monotonic() - started:.2f}s")
+        # The fast loop measures moves against the prices this analysis saw
+        price_guard.set_reference(next(iter(snapshots.values())).prices)
     except Exception as e:
         print(f"Error: {e}")
     else:
-        max_retries = 5
-        retry_delay_seconds = 5
-        decision = None
-        for attempt in range(max_retries):
-            try:
-                advice = analyze_data_with_gpt4(news_data, json.dumps(data_json), json.dumps(last_decisions), fear_and_greed, json.dumps(current_status))
-                if advice:
-                    decision = json.loads(advice)
-                    break
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing failed: {e}. Retrying in {retry_delay_seconds} seconds...")
-                time.sleep(retry_delay_seconds)
-                print(f"Attempt {attempt + 2} of {max_retries}")
-        if not decision:
-            print("Failed to make a decision after maximum retries.")
-            return
+        # Accounts whose balances failed have no snapshot and sit this cycle out
+        ready = [account for account in accounts if account.name in snapshots]
+        if len(ready) == 1:
+            decide_and_execute(ready[0], snapshots[ready[0].name])
         else:
-            try:
-                for ticker, decision_data in decision.items():
-                    percentage = decision_data.get('percentage', 100)
-
-                    if decision_data.get('decision') == "buy":
-                        execute_buy(ticker, percentage)
-                    elif decision_data.get('decision') == "sell":
-                        execute_sell(ticker, percentage)
+            with ThreadPoolExecutor(max_workers=min(len(ready), ACCOUNT_WORKERS), thread_name_prefix="account") as executor:
+                futures = {account.name: executor.submit(decide_and_execute, account, snapshots[account.name]) for account in ready}
+                for name, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Decision cycle failed for {name}: {e}")
+    finally:
+        flush_notifications(accounts)
+
+def guard_positions(account, prices, tickers=TICKERS):
+    """Applies account's stop-loss / take-profit rules at `prices`, selling and recording any hits."""
+    try:
+        balances = {b['currency']: b for b in account.upbit.get_balances()}
+    except Exception as e:
+        print(f"Balance check failed ({account.name}): {e}")
+        return {}
+    krw_balance = float(balances.get('KRW', {}).get('balance', 0))
+    positions = {}
+    current_status = {}
+    for ticker in tickers:
+        balance = balances.get(ticker.split('-')[1], {})
+        coin_balance = float(balance.get('balance', 0))
+        coin_avg_buy_price = float(balance.get('avg_buy_price', 0))
+        positions[ticker] = (coin_balance, coin_avg_buy_price)
+        current_status[ticker] = json.dumps({'coin_balance': coin_balance, 'krw_balance': krw_balance, 'coin_avg_buy_price': coin_avg_buy_price})
+
+    sells = account.guard.check_rules(prices, positions)
+    orders = []
+    for ticker, (percentage, reason) in sells.items():
+        print(f"{ticker}: {reason}")
+        order = execute_sell(ticker, percentage, account)
+        if order is not None:
+            orders.append(order)
+    if orders:
+        wait(orders, timeout=ORDER_POLL_TIMEOUT + 5)
+    if sells:
+        try:
+            record_decisions({ticker: {'decision': 'sell', 'percentage': percentage, 'reason': reason}
+                              for ticker, (percentage, reason) in sells.items()}, current_status, prices, account.db_path)
+        except Exception as e:
+            print(f"Failed to save decisions to DB ({account.name}): {e}")
+    return sells
+
+def check_prices(on_large_move=None, tickers=TICKERS, accounts=None):
+    """
+    Fast-loop step: one batched price request shared by all accounts, one balance request
+    per account, then each account's local stop-loss / take-profit rules. Calls
+    on_large_move(reason) when the market moved enough since the last analysis to justify
+    an early LLM cycle.
+    """
+    accounts = accounts or [default_account]
+    try:
+        prices = market_data.get_ask_prices(tickers)
+    except Exception as e:
+        print(f"Price check failed: {e}")
+        return
+    sold = False
+    for account in accounts:
+        sold = bool(guard_positions(account, prices, tickers)) or sold
+    if sold:
+        flush_notifications(accounts)
+
+    move = price_guard.check_move(prices)
+    if move and on_large_move:
+        on_large_move(move)
+
+def execute_decision(ticker, decision_data, account=None):
+    try:
+        percentage = decision_data.get('percentage', 100)
 
-                    save_decision_to_db(ticker, decision_data, current_status[ticker])
-            except Exception as e:
-                print(f"Failed to execute the decision or save to DB: {e}")
+        if decision_data.get('decision') == "buy":
+            return execute_buy(ticker, percentage, account)
+        elif decision_data.get('decision') == "sell":
+            return execute_sell(ticker, percentage, account)
+    except Exception as e:
+        print(f"Failed to execute the decision: {e}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='GPT 자동매매 프로그램')
     parser.add_argument('--mode', type=str, default='normal', choices=['test', 'normal'], help='실행 모드 (test: 테스트 모드, normal: 일반 모드)')
+    parser.add_argument('--two-tier', action='store_true', help='빠른 가격 감시 루프(손절/익절, 급변 시 GPT 분석)를 함께 실행')
+    parser.add_argument('--accounts', type=str, nargs='?', const=ACCOUNTS_FILE, default=None,
+                        help=f'여러 계정을 한 프로세스에서 운용 (계정 설정 JSON 경로, 기본: {ACCOUNTS_FILE})')
     args = parser.parse_args()
 
-    initialize_db()
+    accounts = load_accounts(args.accounts) if args.accounts else [default_account]
+    for account in accounts:
+        initialize_db(account.db_path)
+    if len(accounts) > 1:
+        print(f"{len(accounts)}개 계정을 운용합니다: {', '.join(account.name for account in accounts)}")
+    if ws_feed.MARKET_FEED == "websocket":
+        ws_feed.start_feed(TICKERS)
 
+    scheduler = Scheduler()
+    cycle = lambda: make_decision_and_execute(accounts)
     if args.mode == 'test':
         print("테스트 모드로 실행합니다.")
-        schedule.every().minute.do(make_decision_and_execute)
+        llm_job = scheduler.add_job(cycle, interval(60), name="make_decision_and_execute")
     else:
         print("일반 모드로 실행합니다.")
-        schedule.every().day.at("23:01").do(make_decision_and_execute)
-        schedule.every().day.at("07:01").do(make_decision_and_execute)
-        schedule.every().day.at("15:01").do(make_decision_and_execute)
+        llm_job = scheduler.add_job(cycle, daily_at("23:01", "07:01", "15:01"), name="make_decision_and_execute")
+
+    if args.two_tier:
+        print(f"가격 감시 루프를 {FAST_LOOP_INTERVAL}초 간격으로 실행합니다.")
+        scheduler.add_job(lambda: check_prices(on_large_move=lambda reason: scheduler.run_now(llm_job, reason), accounts=accounts),
+                          interval(FAST_LOOP_INTERVAL), name="check_prices", missed='skip', overlap='skip')
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    scheduler.run_forever()
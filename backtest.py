@@ -0,0 +1,323 @@
+"""
+Offline backtest of the autotrade_v2 pipeline.
+prepare_frames (the data fetch_and_prepare_data encodes), get_current_status and
+execute_buy/execute_sell run unchanged against a simulated exchange and market fed from the
+candle store; the LLM step is replaced by a rule-based or recorded decision source:
+
+    python backtest.py --download --days 365                 # fill candles.sqlite once
+    python backtest.py --days 365 --cycle-hours 6 --decisions rule
+    python backtest.py --decisions recorded --start 2024-01-01 --end 2024-07-01
+"""
+import io
+import time
+import uuid
+import argparse
+import contextlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+import candle_store
+import decision_store
+import llm_standin
+import autotrade_v2
+from order_tracker import OrderTracker
+from accounts import Account
+
+FEE_RATE = 0.0005  # Upbit KRW market fee
+SLIPPAGE = 0.0005  # fraction of the price lost on every market order
+MIN_ORDER_KRW = 5000
+SPREAD = 0.0002  # half-spread of the simulated top of book
+
+
+class SimulatedMarket:
+    """Serves stored candles, prices and orderbooks as of `now`, with the candle_store / market_data call signatures."""
+
+    def __init__(self, tickers, start, end, db_path=candle_store.CANDLE_DB_PATH, daily_lookback=60, hourly_lookback=48):
+        self.tickers = list(tickers)
+        self.now = start
+        self.frames = {}
+        for ticker in self.tickers:
+            self.frames[(ticker, 'day')] = candle_store.load_range(ticker, 'day', start - timedelta(days=daily_lookback), end, db_path)
+            self.frames[(ticker, 'minute60')] = candle_store.load_range(ticker, 'minute60', start - timedelta(hours=hourly_lookback), end, db_path)
+            if self.frames[(ticker, 'minute60')].empty:
+                raise RuntimeError(f"No stored minute60 candles for {ticker}; run with --download first")
+        self._index = {key: df.index.values for key, df in self.frames.items()}
+
+    def get_ohlcv(self, ticker, interval="day", count=200, **kwargs):
+        # Only bars that have closed by `now`, like the live feed would have returned
+        bar = timedelta(minutes=candle_store.INTERVAL_MINUTES[interval])
+        end = self._index[(ticker, interval)].searchsorted(np.datetime64(self.now - bar), side='right')
+        return self.frames[(ticker, interval)].iloc[max(end - count, 0):end]
+
+    def price(self, ticker):
+        index = self._index[(ticker, 'minute60')]
+        df = self.frames[(ticker, 'minute60')]
+        position = index.searchsorted(np.datetime64(self.now))
+        if position < len(index) and index[position] == np.datetime64(self.now):
+            return float(df['open'].iat[position])
+        return float(df['close'].iat[max(position - 1, 0)])
+
+    def get_prices(self, tickers, ttl=None):
+        return {ticker: self.price(ticker) for ticker in tickers}
+
+    def get_current_price(self, ticker, ttl=None):
+        return self.price(ticker)
+
+    def get_orderbooks(self, tickers, ttl=None):
+        timestamp = int(self.now.timestamp() * 1000)
+        orderbooks = {}
+        for ticker in tickers:
+            price = self.price(ticker)
+            units = [{"ask_price": price * (1 + SPREAD), "bid_price": price * (1 - SPREAD), "ask_size": 1.0, "bid_size": 1.0}]
+            orderbooks[ticker] = {"market": ticker, "timestamp": timestamp, "total_ask_size": 1.0,
+                                  "total_bid_size": 1.0, "orderbook_units": units}
+        return orderbooks
+
+    def get_orderbook(self, ticker, ttl=None):
+        return self.get_orderbooks([ticker])[ticker]
+
+    def get_ask_prices(self, tickers, ttl=None):
+        return {ticker: book['orderbook_units'][0]['ask_price'] for ticker, book in self.get_orderbooks(tickers).items()}
+
+    def get_ask_price(self, ticker, ttl=None):
+        return self.get_ask_prices([ticker])[ticker]
+
+
+class SimulatedExchange:
+    """The part of pyupbit.Upbit the pipeline uses, filling market orders instantly at the simulated price."""
+
+    def __init__(self, market, start_krw, fee_rate=FEE_RATE, slippage=SLIPPAGE, min_order=MIN_ORDER_KRW):
+        self.market = market
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.min_order = min_order
+        self.krw = float(start_krw)
+        self.holdings = {}  # currency -> [balance, avg_buy_price]
+        self.orders = {}
+        self.fees_paid = 0.0
+        self.trades = 0
+
+    def get_balances(self):
+        balances = [{"currency": "KRW", "balance": str(self.krw), "locked": "0", "avg_buy_price": "0", "unit_currency": "KRW"}]
+        for currency, (balance, avg_buy_price) in self.holdings.items():
+            if balance > 0:
+                balances.append({"currency": currency, "balance": str(balance), "locked": "0",
+                                 "avg_buy_price": str(avg_buy_price), "unit_currency": "KRW"})
+        return balances
+
+    def get_balance(self, ticker="KRW"):
+        currency = ticker.split('-')[-1]
+        if currency == "KRW":
+            return self.krw
+        return self.holdings.get(currency, [0.0, 0.0])[0]
+
+    def _order(self, ticker, side, volume, funds, fee, price):
+        order_uuid = str(uuid.uuid4())
+        self.orders[order_uuid] = {
+            "uuid": order_uuid, "side": side, "ord_type": "price" if side == "bid" else "market", "market": ticker,
+            "state": "done", "created_at": self.market.now.isoformat(), "executed_volume": str(volume),
+            "paid_fee": str(fee), "price": str(price), "trades": [{"price": str(price), "volume": str(volume), "funds": str(funds)}],
+        }
+        self.fees_paid += fee
+        self.trades += 1
+        return {"uuid": order_uuid, "side": side, "market": ticker, "state": "wait"}
+
+    @staticmethod
+    def _error(name, message):
+        return {"error": {"name": name, "message": message}}
+
+    def buy_market_order(self, ticker, price, *args, **kwargs):
+        funds = float(price)
+        fee = funds * self.fee_rate
+        if funds < self.min_order:
+            return self._error("under_min_total_bid", f"최소주문금액 이상으로 주문해주세요 ({self.min_order} KRW)")
+        if funds + fee > self.krw + 1e-9:
+            return self._error("insufficient_funds_bid", "주문가능한 금액(KRW)이 부족합니다.")
+        fill_price = self.market.price(ticker) * (1 + self.slippage)
+        volume = funds / fill_price
+        currency = ticker.split('-')[1]
+        balance, avg_buy_price = self.holdings.get(currency, [0.0, 0.0])
+        self.holdings[currency] = [balance + volume, (balance * avg_buy_price + funds) / (balance + volume)]
+        self.krw -= funds + fee
+        return self._order(ticker, "bid", volume, funds, fee, fill_price)
+
+    def sell_market_order(self, ticker, volume, *args, **kwargs):
+        volume = float(volume)
+        currency = ticker.split('-')[1]
+        balance, avg_buy_price = self.holdings.get(currency, [0.0, 0.0])
+        if volume > balance + 1e-12:
+            return self._error("insufficient_funds_ask", "주문가능한 금액(코인)이 부족합니다.")
+        fill_price = self.market.price(ticker) * (1 - self.slippage)
+        funds = volume * fill_price
+        if funds < self.min_order:
+            return self._error("under_min_total_ask", f"최소주문금액 이상으로 주문해주세요 ({self.min_order} KRW)")
+        fee = funds * self.fee_rate
+        remaining = balance - volume
+        self.holdings[currency] = [remaining, avg_buy_price if remaining > 1e-12 else 0.0]
+        self.krw += funds - fee
+        return self._order(ticker, "ask", volume, funds, fee, fill_price)
+
+    def get_order(self, order_uuid, *args, **kwargs):
+        return self.orders.get(order_uuid, self._error("order_not_found", "주문을 찾지 못했습니다."))
+
+    def total_value(self):
+        return self.krw + sum(balance * self.market.price(f"KRW-{currency}") for currency, (balance, _) in self.holdings.items())
+
+
+def rule_decisions(now, frames, current_status):
+    """llm_standin's RSI rule applied to the frames the pipeline prepared."""
+    return llm_standin.decide_from_frames(frames)
+
+
+class RecordedDecisions:
+    """Replays decisions from the decisions database: each cycle acts on what was recorded since the previous one."""
+
+    def __init__(self, db_path=decision_store.DB_PATH):
+        history = decision_store.history_columns(columns=('timestamp', 'ticker', 'decision', 'percentage', 'reason'), db_path=db_path)
+        self.timestamps = history['timestamp']
+        self.history = history
+        self.last = None
+
+    def __call__(self, now, frames, current_status):
+        now_ms = int(now.timestamp() * 1000)
+        start = 0 if self.last is None else self.timestamps.searchsorted(self.last, side='right')
+        end = self.timestamps.searchsorted(now_ms, side='right')
+        self.last = now_ms
+        decisions = {}
+        for i in range(start, end):
+            # Later rows for the same ticker replace earlier ones
+            decisions[self.history['ticker'][i]] = {
+                "decision": self.history['decision'][i],
+                "percentage": 0 if np.isnan(self.history['percentage'][i]) else float(self.history['percentage'][i]),
+                "reason": self.history['reason'][i],
+            }
+        return decisions
+
+
+@dataclass
+class BacktestResult:
+    start_value: float
+    equity: pd.Series
+    benchmark: pd.Series
+    trades: int
+    fees_paid: float
+    elapsed: float
+    decisions: dict = field(default_factory=dict)  # decision -> count
+
+    def max_drawdown(self):
+        peak = self.equity.cummax()
+        return float(((self.equity - peak) / peak).min() * 100) if len(self.equity) else 0.0
+
+    def summary(self):
+        end_value = float(self.equity.iloc[-1]) if len(self.equity) else self.start_value
+        benchmark_end = float(self.benchmark.iloc[-1]) if len(self.benchmark) else self.start_value
+        return "\n".join([
+            f"기간: {self.equity.index[0]} ~ {self.equity.index[-1]} ({len(self.equity)} 사이클, {self.elapsed:.1f}초)",
+            f"시작 자산: {self.start_value:,.0f} KRW, 종료 자산: {end_value:,.0f} KRW",
+            f"수익률: {(end_value / self.start_value - 1) * 100:.2f}%, 최대 낙폭: {self.max_drawdown():.2f}%",
+            f"동일 비중 보유 수익률: {(benchmark_end / self.start_value - 1) * 100:.2f}%",
+            f"거래 횟수: {self.trades}, 총 수수료: {self.fees_paid:,.0f} KRW, 결정: {self.decisions}",
+        ])
+
+
+@contextlib.contextmanager
+def simulated_pipeline(market):
+    """Points autotrade_v2's market data, candle and notification hooks at the simulation."""
+    replacements = {
+        'market_data': market,
+        'candle_store': market,
+        'send_slack_message': lambda *args, **kwargs: None,
+    }
+    originals = {name: getattr(autotrade_v2, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(autotrade_v2, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(autotrade_v2, name, value)
+
+
+def run_backtest(tickers, start, end, cycle_hours=6, start_krw=1_000_000, decide=rule_decisions,
+                 fee_rate=FEE_RATE, slippage=SLIPPAGE, db_path=candle_store.CANDLE_DB_PATH, verbose=False):
+    market = SimulatedMarket(tickers, start, end, db_path)
+    exchange = SimulatedExchange(market, start_krw, fee_rate, slippage)
+    account = Account(name="backtest", upbit=exchange, order_tracker=OrderTracker(exchange, max_workers=1, initial_delay=0, timeout=1))
+    cycles = pd.date_range(start, end, freq=f"{cycle_hours}h", inclusive='left')
+    equity, benchmark = [], []
+    decision_counts = {}
+    first_prices = None
+    started = time.monotonic()
+
+    with simulated_pipeline(market):
+        for now in cycles:
+            market.now = now.to_pydatetime()
+            # The pipeline prints per step; keep backtest output to the summary unless asked
+            output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            with output:
+                # The deciders read the frames directly; only a GPT prompt needs them encoded
+                frames = {ticker: autotrade_v2.prepare_frames(ticker) for ticker in tickers}
+                balances = account.upbit.get_balances()  # one balance request per cycle, as in the pipeline
+                current_status = {ticker: autotrade_v2.get_current_status(ticker, account, balances) for ticker in tickers}
+                decisions = decide(market.now, frames, current_status)
+                for ticker, decision in decisions.items():
+                    if ticker not in tickers:
+                        continue
+                    decision_counts[decision.get('decision')] = decision_counts.get(decision.get('decision'), 0) + 1
+                    order = autotrade_v2.execute_decision(ticker, decision, account)
+                    if order is not None:
+                        order.result()
+            prices = market.get_prices(tickers)
+            if first_prices is None:
+                first_prices = prices
+            equity.append(exchange.total_value())
+            benchmark.append(sum(start_krw / len(tickers) * prices[t] / first_prices[t] for t in tickers))
+
+    return BacktestResult(
+        start_value=float(start_krw),
+        equity=pd.Series(equity, index=cycles),
+        benchmark=pd.Series(benchmark, index=cycles),
+        trades=exchange.trades,
+        fees_paid=exchange.fees_paid,
+        elapsed=time.monotonic() - started,
+        decisions=decision_counts,
+    )
+
+
+def download(tickers, days, db_path=candle_store.CANDLE_DB_PATH):
+    for ticker in tickers:
+        for interval, count in (('day', days + 60), ('minute60', days * 24 + 48)):
+            df = candle_store.get_ohlcv(ticker, interval, count=count, db_path=db_path)
+            print(f"{ticker} {interval}: {0 if df is None else len(df)}개 캔들 저장")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='GPT 자동매매 백테스트')
+    parser.add_argument('--tickers', type=str, default=",".join(autotrade_v2.TICKERS))
+    parser.add_argument('--days', type=int, default=365, help='--start가 없을 때 종료 시점부터 거슬러 올라갈 일수')
+    parser.add_argument('--start', type=str, default=None, help='시작일 (YYYY-MM-DD)')
+    parser.add_argument('--end', type=str, default=None, help='종료일 (YYYY-MM-DD, 기본: 오늘 00:00)')
+    parser.add_argument('--cycle-hours', type=int, default=6, help='의사 결정 주기 (시간)')
+    parser.add_argument('--start-krw', type=float, default=1_000_000, help='시작 원금 (KRW)')
+    parser.add_argument('--decisions', type=str, default='rule', choices=['rule', 'recorded'],
+                        help='rule: RSI 규칙, recorded: 결정 DB에 기록된 결정 재생')
+    parser.add_argument('--fee', type=float, default=FEE_RATE, help='거래 수수료율')
+    parser.add_argument('--slippage', type=float, default=SLIPPAGE, help='슬리피지 비율')
+    parser.add_argument('--download', action='store_true', help='백테스트 전에 캔들을 내려받아 저장')
+    parser.add_argument('--equity-csv', type=str, default=None, help='자산 곡선을 저장할 CSV 경로')
+    parser.add_argument('--verbose', action='store_true', help='파이프라인 출력 표시')
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',')
+    end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = datetime.strptime(args.start, "%Y-%m-%d") if args.start else end - timedelta(days=args.days)
+    if args.download:
+        download(tickers, (datetime.now() - start).days + 1)
+
+    decide = rule_decisions if args.decisions == 'rule' else RecordedDecisions()
+    result = run_backtest(tickers, start, end, args.cycle_hours, args.start_krw, decide, args.fee, args.slippage, verbose=args.verbose)
+    print(result.summary())
+    if args.equity_csv:
+        pd.DataFrame({'equity': result.equity, 'benchmark': result.benchmark}).to_csv(args.equity_csv)
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import pandas as pd
+import pyupbit
+import market_data
+
+CANDLE_DB_PATH = os.getenv("CANDLE_DB_PATH", "candles.sqlite")
+COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'value']
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Upbit candle timestamps are naive KST, whatever the host's time zone
+KST = ZoneInfo("Asia/Seoul")
+
+# Bar length in minutes for each pyupbit interval ("month" is approximated; over-fetching a bar is harmless)
+INTERVAL_MINUTES = {
+    'minute1': 1, 'minute3': 3, 'minute5': 5, 'minute10': 10, 'minute15': 15,
+    'minute30': 30, 'minute60': 60, 'minute240': 240,
+    'day': 1440, 'days': 1440, 'week': 10080, 'weeks': 10080, 'month': 43200, 'months': 43200,
+}
+
+
+def initialize_store(db_path=CANDLE_DB_PATH):
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS candles (
+                ticker TEXT,
+                interval TEXT,
+                timestamp TEXT,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                value REAL,
+                PRIMARY KEY (ticker, interval, timestamp)
+            ) WITHOUT ROWID;
+        ''')
+        conn.commit()
+
+
+def _missing_bar_count(last_timestamp, interval, count):
+    # Always re-fetch the newest stored bar too, since it may have been an unfinished candle
+    if last_timestamp is None:
+        return count
+    elapsed = datetime.now(KST).replace(tzinfo=None) - datetime.strptime(last_timestamp, TIMESTAMP_FORMAT)
+    bar = timedelta(minutes=INTERVAL_MINUTES.get(interval, 1440))
+    return min(count, max(int(elapsed / bar), 0) + 2)
+
+
+def _window_is_contiguous(cursor, ticker, interval, last_timestamp, count):
+    # With fixed-length bars the count-th newest stored bar must be exactly count-1 bars before the newest
+    if interval in ('month', 'months'):
+        return True
+    cursor.execute('''
+        SELECT timestamp FROM candles WHERE ticker = ? AND interval = ?
+        ORDER BY timestamp DESC LIMIT 1 OFFSET ?
+    ''', (ticker, interval, count - 1))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+    bar = timedelta(minutes=INTERVAL_MINUTES.get(interval, 1440))
+    span = datetime.strptime(last_timestamp, TIMESTAMP_FORMAT) - datetime.strptime(row[0], TIMESTAMP_FORMAT)
+    return span == bar * (count - 1)
+
+
+def _store_candles(conn, ticker, interval, df):
+    rows = [
+        (ticker, interval, ts.strftime(TIMESTAMP_FORMAT), *(float(row[c]) for c in COLUMNS))
+        for ts, row in df[COLUMNS].iterrows()
+    ]
+    conn.executemany('''
+        INSERT OR REPLACE INTO candles (ticker, interval, timestamp, open, high, low, close, volume, value)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+def _load_candles(conn, ticker, interval, count):
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT timestamp, open, high, low, close, volume, value FROM candles
+        WHERE ticker = ? AND interval = ?
+        ORDER BY timestamp DESC
+        LIMIT ?
+    ''', (ticker, interval, count))
+    rows = cursor.fetchall()[::-1]
+    if not rows:
+        return None
+    df = pd.DataFrame([row[1:] for row in rows], columns=COLUMNS)
+    df.index = pd.to_datetime([row[0] for row in rows], format=TIMESTAMP_FORMAT)
+    return df
+
+
+def get_ohlcv(ticker, interval="day", count=200, db_path=CANDLE_DB_PATH):
+    """
+    Drop-in replacement for pyupbit.get_ohlcv backed by a local candle store.
+    Only candles newer than the last stored bar are requested from Upbit; the
+    returned window of `count` bars is served from the store.
+    """
+    initialize_store(db_path)
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT MAX(timestamp), COUNT(*) FROM candles WHERE ticker = ? AND interval = ?', (ticker, interval))
+        last_timestamp, stored_count = cursor.fetchone()
+        if stored_count < count or not _window_is_contiguous(cursor, ticker, interval, last_timestamp, count):
+            # Not enough history stored to serve the window, or a hole in it; fetch it in full once
+            last_timestamp = None
+
+        live = market_data.get_candles(ticker, interval)
+        if last_timestamp is not None and live is not None and len(live) and \
+                live.index[0] < datetime.strptime(last_timestamp, TIMESTAMP_FORMAT):
+            # The feed has seen every trade since the newest stored bar (its bars restart on every reconnect,
+            # so a bar spanning an outage is never older than its first, partial one); no REST request needed
+            df_new = live[live.index >= datetime.strptime(last_timestamp, TIMESTAMP_FORMAT)]
+        else:
+            fetch_count = _missing_bar_count(last_timestamp, interval, count)
+            try:
+                df_new = pyupbit.get_ohlcv(ticker, interval=interval, count=fetch_count)
+            except Exception as e:
+                print(f"Error fetching candles for {ticker} ({interval}): {e}")
+                df_new = None
+
+        if df_new is not None and not df_new.empty:
+            _store_candles(conn, ticker, interval, df_new)
+        elif last_timestamp is not None:
+            print(f"Serving stored candles for {ticker} ({interval}); refresh failed.")
+
+        return _load_candles(conn, ticker, interval, count)
+
+
+def load_range(ticker, interval, start=None, end=None, db_path=CANDLE_DB_PATH):
+    """Every stored bar for ticker/interval with start <= timestamp < end (either bound optional)."""
+    initialize_store(db_path)
+    conditions, params = ["ticker = ?", "interval = ?"], [ticker, interval]
+    if start is not None:
+        conditions.append("timestamp >= ?")
+        params.append(start.strftime(TIMESTAMP_FORMAT))
+    if end is not None:
+        conditions.append("timestamp < ?")
+        params.append(end.strftime(TIMESTAMP_FORMAT))
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        rows = conn.execute(f'''
+            SELECT timestamp, open, high, low, close, volume, value FROM candles
+            WHERE {' AND '.join(conditions)}
+            ORDER BY timestamp
+        ''', params).fetchall()
+    df = pd.DataFrame([row[1:] for row in rows], columns=COLUMNS)
+    df.index = pd.to_datetime([row[0] for row in rows], format=TIMESTAMP_FORMAT)
+    return df
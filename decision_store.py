@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import threading
+import numpy as np
+from contextlib import contextmanager
+
+DB_PATH = os.getenv("DB_PATH", "trading_decisions.sqlite")
+
+# MIGRATIONS[i] upgrades a database from PRAGMA user_version i to i + 1
+MIGRATIONS = [
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS decisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            ticker TEXT,
+            decision TEXT,
+            percentage REAL,
+            reason TEXT,
+            coin_balance REAL,
+            krw_balance REAL,
+            coin_avg_buy_price REAL,
+            coin_price REAL
+        );
+        ''',
+        # Per-ticker latest-N ordering; also covers the latest-state (balances/price) lookups
+        '''
+        CREATE INDEX IF NOT EXISTS idx_decisions_ticker_timestamp
+        ON decisions (ticker, timestamp, coin_balance, krw_balance, coin_avg_buy_price, coin_price);
+        ''',
+    ],
+    [
+        # 'YYYY-MM-DD HH:MM:SS' local-time strings -> epoch milliseconds (INTEGER)
+        '''
+        UPDATE decisions
+        SET timestamp = CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000
+        WHERE typeof(timestamp) = 'text';
+        ''',
+    ],
+]
+
+HISTORY_COLUMNS = ('id', 'timestamp', 'ticker', 'decision', 'percentage', 'reason',
+                   'coin_balance', 'krw_balance', 'coin_avg_buy_price', 'coin_price')
+NUMERIC_COLUMNS = {'percentage', 'coin_balance', 'krw_balance', 'coin_avg_buy_price', 'coin_price'}
+
+_connections = {}
+_lock = threading.RLock()
+
+
+def migrate(conn, db_path=DB_PATH):
+    """Applies pending MIGRATIONS in place, one transaction per schema version."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for target in range(version, len(MIGRATIONS)):
+        with conn:
+            for statement in MIGRATIONS[target]:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {target + 1}')
+        print(f"Migrated {db_path} to schema version {target + 1}")
+
+
+def get_connection(db_path=DB_PATH):
+    """
+    Long-lived connection shared by every caller (and thread) in the process.
+    The database runs in WAL mode so dashboard readers never block the trader's writes.
+    """
+    with _lock:
+        conn = _connections.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            migrate(conn, db_path)
+            _connections[db_path] = conn
+        return conn
+
+
+@contextmanager
+def transaction(db_path=DB_PATH):
+    """Serializes access to the shared connection and commits (or rolls back) on exit."""
+    conn = get_connection(db_path)
+    with _lock, conn:
+        yield conn
+
+
+def query(sql, params=(), db_path=DB_PATH):
+    conn = get_connection(db_path)
+    with _lock:
+        return conn.execute(sql, params).fetchall()
+
+
+def history_columns(ticker=None, since=None, until=None, after_id=None, before_id=None, limit=None,
+                    columns=HISTORY_COLUMNS, db_path=DB_PATH):
+    """
+    Decision history, oldest first, as {column: numpy array} ready for pd.DataFrame(...).
+    `since` (inclusive) and `until` (exclusive) are epoch-millisecond bounds; `after_id` and
+    `before_id` page by row id. With `limit`, only the newest `limit` matching rows are returned.
+    """
+    unknown = set(columns) - set(HISTORY_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown history columns: {sorted(unknown)}")
+    conditions, params = [], []
+    if ticker is not None:
+        conditions.append("ticker = ?")
+        params.append(ticker)
+    if since is not None:
+        conditions.append("timestamp >= ?")
+        params.append(int(since))
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(int(until))
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(int(after_id))
+    if before_id is not None:
+        conditions.append("id < ?")
+        params.append(int(before_id))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    if limit is None:
+        rows = query(f"SELECT {', '.join(columns)} FROM decisions {where} ORDER BY timestamp, id", params, db_path)
+    else:
+        # Row ids follow write order, so the newest rows come straight off the rowid b-tree
+        rows = query(f"SELECT {', '.join(columns)} FROM decisions {where} ORDER BY id DESC LIMIT ?",
+                     params + [int(limit)], db_path)[::-1]
+
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    history = {}
+    for column, column_values in zip(columns, values):
+        if column in ('id', 'timestamp'):
+            history[column] = np.array(column_values, dtype=np.int64)
+        elif column in NUMERIC_COLUMNS:
+            history[column] = np.array(column_values, dtype=float)  # NULL -> nan
+        else:
+            history[column] = np.array(column_values, dtype=object)
+    return history
+
+
+def close_all():
+    with _lock:
+        for conn in _connections.values():
+            conn.close()
+        _connections.clear()
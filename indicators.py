@@ -0,0 +1,230 @@
+import copy
+import threading
+import numpy as np
+import pandas as pd
+
+SMA_LENGTHS = (3, 5, 10, 20)
+EMA_LENGTHS = (3, 5, 10, 20)
+RSI_LENGTH = 14
+STOCH_K, STOCH_D, STOCH_SMOOTH_K = 14, 3, 3
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_LENGTH, BB_STD = 20, 2
+
+STOCH_K_COLUMN = f"STOCHk_{STOCH_K}_{STOCH_D}_{STOCH_SMOOTH_K}"
+STOCH_D_COLUMN = f"STOCHd_{STOCH_K}_{STOCH_D}_{STOCH_SMOOTH_K}"
+
+
+class IndicatorState:
+    """Everything needed to extend the indicator series by more bars without the earlier ones."""
+
+    def __init__(self, ema_lengths, tail_length):
+        self.count = 0
+        self.tail_length = tail_length
+        self.tail_close = np.empty(0)
+        self.tail_high = np.empty(0)
+        self.tail_low = np.empty(0)
+        self.tail_stoch = np.empty(0)
+        self.tail_stoch_k = np.empty(0)
+        self.ema = {length: [np.nan, 0.0] for length in ema_lengths}  # length -> [value, seed sum]
+        self.macd_fast = self.macd_slow = self.macd_signal = np.nan
+        self.prev_close = np.nan
+        self.rsi_pos = self.rsi_neg = self.rsi_weight = 0.0
+        self.rsi_count = 0
+
+    def copy(self):
+        # The tail arrays are replaced rather than modified, so only the EMA pairs need copying
+        state = copy.copy(self)
+        state.ema = {length: list(pair) for length, pair in self.ema.items()}
+        return state
+
+
+def _windows(tail, new, window):
+    # The trailing `window` values for each new bar, NaN-padded where there is not enough history;
+    # the last k columns are the trailing k-bar windows, so one view serves every shorter length
+    values = np.concatenate([np.full(window - 1, np.nan), tail, new])[-(len(new) + window - 1):]
+    # Fancy indexing costs a fraction of sliding_window_view's setup on the short arrays seen here
+    return values[np.arange(len(new))[:, None] + np.arange(window)]
+
+
+class IndicatorEngine:
+    """
+    Computes the SMA/EMA/RSI/Stochastic/MACD/Bollinger columns used in the prompts in a single
+    NumPy pass over the close/high/low arrays.
+    When a `key` (e.g. (ticker, interval)) is given, the state after the last completed bar is
+    cached, so a later call over the same window plus appended bars only processes the new bars.
+    Results always equal a fresh computation over the frame passed in; a window that starts at a
+    different bar is recomputed. The newest bar is always recomputed because the exchange keeps
+    updating the unfinished candle.
+    """
+
+    def __init__(self, sma_lengths=SMA_LENGTHS, ema_lengths=EMA_LENGTHS, history=500):
+        self.sma_lengths = tuple(sma_lengths)
+        self.ema_lengths = tuple(ema_lengths)
+        self.history = history
+        self.columns = (
+            [f"SMA_{length}" for length in self.sma_lengths]
+            + [f"EMA_{length}" for length in self.ema_lengths]
+            + [f"RSI_{RSI_LENGTH}", STOCH_K_COLUMN, STOCH_D_COLUMN, 'MACD', 'Signal_Line', 'MACD_Histogram',
+               'Middle_Band', 'Upper_Band', 'Lower_Band']
+        )
+        self._column_index = pd.Index(self.columns)  # built once; a list is converted on every frame
+        self._tail_length = max(self.sma_lengths + (BB_LENGTH, STOCH_K)) - 1
+        self._cache = {}  # key -> (state, bar timestamps, outputs) for completed bars
+        self._lock = threading.Lock()
+
+    def new_state(self):
+        return IndicatorState(self.ema_lengths, self._tail_length)
+
+    def advance(self, state, close, high, low, pending=0):
+        """
+        Feeds new bars into `state` (mutated in place) and returns their indicator values.
+        The last `pending` bars are computed but left out of `state`, for a candle still forming.
+        """
+        m = len(close)
+        if m == 0:
+            return {column: np.empty(0) for column in self.columns}
+        committed = m - pending
+        out = {}
+
+        # Windowed indicators, vectorized over the new bars
+        close_windows = _windows(state.tail_close, close, self._tail_length + 1)
+        for length in self.sma_lengths:
+            out[f"SMA_{length}"] = close_windows[:, -length:].sum(axis=1) / length
+        middle = close_windows[:, -BB_LENGTH:].sum(axis=1) / BB_LENGTH
+        std_dev = close_windows[:, -BB_LENGTH:].std(axis=1, ddof=1)
+        out['Middle_Band'] = middle
+        out['Upper_Band'] = middle + std_dev * BB_STD
+        out['Lower_Band'] = middle - std_dev * BB_STD
+
+        lowest_low = _windows(state.tail_low, low, STOCH_K).min(axis=1)
+        highest_high = _windows(state.tail_high, high, STOCH_K).max(axis=1)
+        price_range = highest_high - lowest_low
+        price_range[price_range == 0] += np.finfo(float).eps
+        stoch = 100 * (close - lowest_low) / price_range
+        stoch_k = _windows(state.tail_stoch, stoch, STOCH_SMOOTH_K).sum(axis=1) / STOCH_SMOOTH_K
+        stoch_d = _windows(state.tail_stoch_k, stoch_k, STOCH_D).sum(axis=1) / STOCH_D
+        out[STOCH_K_COLUMN] = stoch_k
+        out[STOCH_D_COLUMN] = stoch_d
+
+        # Recursive indicators, one step per bar, on Python floats and locals (far cheaper per step
+        # than NumPy scalars for the few dozen bars a call usually carries); the running values are
+        # saved to `state` as they stand after the last committed bar
+        nan = float('nan')
+        fast_alpha, slow_alpha, signal_alpha = 2 / (MACD_FAST + 1), 2 / (MACD_SLOW + 1), 2 / (MACD_SIGNAL + 1)
+        rsi_decay = 1 - 1 / RSI_LENGTH
+        n = state.count
+        prices = close.tolist()
+        for length in self.ema_lengths:
+            ema = state.ema[length]
+            value, seed, alpha = ema[0], ema[1], 2 / (length + 1)
+            column = []
+            for i, price in enumerate(prices):
+                if i == committed:
+                    ema[0], ema[1] = value, seed
+                step = n + i
+                if step < length:
+                    # Seeded with the SMA of the first `length` closes, like pandas_ta
+                    seed += price
+                    if step == length - 1:
+                        value = seed / length
+                else:
+                    value = alpha * price + (1 - alpha) * value
+                column.append(value)
+            if committed == m:
+                ema[0], ema[1] = value, seed
+            out[f"EMA_{length}"] = np.array(column)
+
+        fast, slow, signal = state.macd_fast, state.macd_slow, state.macd_signal
+        prev_close, pos, neg, weight, rsi_count = state.prev_close, state.rsi_pos, state.rsi_neg, state.rsi_weight, state.rsi_count
+        macd_out, signal_out, rsi_out = [], [], []
+        for i, price in enumerate(prices + [None]):
+            if i == committed:
+                state.macd_fast, state.macd_slow, state.macd_signal = fast, slow, signal
+                state.prev_close, state.rsi_pos, state.rsi_neg, state.rsi_weight, state.rsi_count = prev_close, pos, neg, weight, rsi_count
+            if price is None:
+                break
+            step = n + i
+            if step == 0:
+                fast = slow = price
+            else:
+                fast = fast_alpha * price + (1 - fast_alpha) * fast
+                slow = slow_alpha * price + (1 - slow_alpha) * slow
+            macd = fast - slow
+            signal = macd if step == 0 else signal_alpha * macd + (1 - signal_alpha) * signal
+            macd_out.append(macd)
+            signal_out.append(signal)
+
+            rsi = nan
+            if step > 0:
+                # Wilder's smoothing as pandas ewm(alpha=1/length, adjust=True)
+                change = price - prev_close
+                pos = max(change, 0.0) + rsi_decay * pos
+                neg = -min(change, 0.0) + rsi_decay * neg
+                weight = 1 + rsi_decay * weight
+                rsi_count += 1
+                total = pos + neg
+                if rsi_count >= RSI_LENGTH and total > 0:
+                    rsi = 100 * pos / total
+            rsi_out.append(rsi)
+            prev_close = price
+        state.count = n + committed
+        macd_out, signal_out = np.array(macd_out), np.array(signal_out)
+        out['MACD'], out['Signal_Line'], out[f"RSI_{RSI_LENGTH}"] = macd_out, signal_out, np.array(rsi_out)
+        out['MACD_Histogram'] = macd_out - signal_out
+
+        tail = state.tail_length
+        state.tail_close = np.concatenate([state.tail_close, close[:committed]])[-tail:]
+        state.tail_high = np.concatenate([state.tail_high, high[:committed]])[-(STOCH_K - 1):]
+        state.tail_low = np.concatenate([state.tail_low, low[:committed]])[-(STOCH_K - 1):]
+        state.tail_stoch = np.concatenate([state.tail_stoch, stoch[:committed]])[-(STOCH_SMOOTH_K - 1):]
+        state.tail_stoch_k = np.concatenate([state.tail_stoch_k, stoch_k[:committed]])[-(STOCH_D - 1):]
+        return out
+
+    def _compute(self, df, key):
+        # Columns through one to_numpy(): each df[...] builds a Series, which costs more than the math here
+        table = df.to_numpy()
+        close, high, low = (table[:, df.columns.get_loc(name)].astype(float) for name in ('close', 'high', 'low'))
+
+        stamps = df.index.to_numpy()
+        cached = self._cache.get(key) if key is not None else None
+        start = 0
+        if cached is not None:
+            state, index, outputs = cached
+            # Recursive indicators (EMA, MACD, RSI) depend on the bar they were seeded from, so only a
+            # computation whose bars are exactly df's first bars can be extended
+            start = len(index)
+            if 0 < start <= len(stamps) and np.array_equal(index, stamps[:start]):
+                state = state.copy()
+            else:
+                cached, start = None, 0
+        if cached is None:
+            state, outputs = self.new_state(), {c: np.empty(0) for c in self.columns}
+
+        # Commit every new bar except the newest, which may still change
+        completed = max(len(df) - 1, start)
+        values = self.advance(state, close[start:], high[start:], low[start:], pending=len(df) - completed)
+        if key is not None:
+            if completed <= self.history:
+                self._cache[key] = (state, stamps[:completed], {c: np.concatenate([outputs[c], values[c][:completed - start]]) for c in self.columns})
+            else:
+                self._cache.pop(key, None)  # too long to keep; such frames are computed from scratch
+        return {c: np.concatenate([outputs[c], values[c]]) for c in self.columns}
+
+    def add_indicators(self, df, key=None):
+        """Returns df with the indicator columns appended."""
+        with self._lock:
+            values = self._compute(df, key)
+        # One 2-D block builds far faster than a frame from a dict of columns
+        block = np.column_stack([values[c] for c in self.columns]) if len(df) else np.empty((0, len(self.columns)))
+        table = df.to_numpy()
+        if table.dtype == float:
+            # An all-float frame (the usual OHLCV candles) is rebuilt as a single block, skipping concat
+            return pd.DataFrame(np.hstack([table, block]), index=df.index, columns=df.columns.append(self._column_index))
+        return pd.concat([df, pd.DataFrame(block, index=df.index, columns=self._column_index)], axis=1)
+
+
+_default_engine = IndicatorEngine()
+
+
+def add_indicators(df, key=None):
+    return _default_engine.add_indicators(df, key)
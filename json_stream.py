@@ -0,0 +1,104 @@
+import json
+
+WHITESPACE = ' \t\r\n'
+
+
+class ObjectStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON object such as
+    {"KRW-BTC": {...}, "KRW-SOL": {...}}.
+    feed() yields every top-level (key, value) member completed by the new text and raises
+    ValueError as soon as the text can no longer be valid JSON, so the caller can abort the
+    stream instead of waiting for the full response.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.closed = False
+        self.member_start = None
+        self.expect = 'open'  # what the next significant character at depth 1 must be
+
+    def _error(self, message):
+        raise ValueError(f"{message} at position {self.pos}: {self.buffer[max(self.pos - 20, 0):self.pos + 1]!r}")
+
+    def _complete_member(self, end):
+        member = self.buffer[self.member_start:end].strip()
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError as e:
+            self._error(f"Malformed member ({e})")
+        self.member_start = None
+        return next(iter(parsed.items()))
+
+    def feed(self, text):
+        self.buffer += text
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            depth = len(self.stack)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if depth == 1 and self.expect == 'key_end':
+                        self.expect = 'colon'
+            elif char in WHITESPACE:
+                if depth == 1 and self.expect == 'scalar':
+                    self.expect = 'value_end'
+            elif self.closed:
+                self._error("Unexpected data after the closing brace")
+            elif not self.started:
+                if char != '{':
+                    self._error("Response is not a JSON object")
+                self.started = True
+                self.stack.append('}')
+                self.expect = 'key_or_close'
+            elif depth == 1 and self.expect in ('key', 'key_or_close'):
+                if char == '"':
+                    self.member_start = self.pos
+                    self.in_string = True
+                    self.expect = 'key_end'
+                elif char == '}' and self.expect == 'key_or_close':
+                    self.stack.pop()
+                    self.closed = True
+                else:
+                    self._error("Expected a member name")
+            elif depth == 1 and self.expect == 'colon':
+                if char != ':':
+                    self._error("Expected ':' after member name")
+                self.expect = 'value'
+            elif depth == 1 and (self.expect == 'value_end' or (self.expect == 'scalar' and char in ',}')):
+                if char not in ',}':
+                    self._error("Expected ',' or '}' after member value")
+                yield self._complete_member(self.pos)
+                if char == ',':
+                    self.expect = 'key'
+                else:
+                    self.stack.pop()
+                    self.closed = True
+            else:
+                # Inside a member value
+                if depth == 1:
+                    self.expect = 'value_end' if char in '"{[' else 'scalar'
+                if char == '"':
+                    self.in_string = True
+                elif char in '{[':
+                    self.stack.append('}' if char == '{' else ']')
+                elif char in '}]':
+                    if depth <= 1 or self.stack[-1] != char:
+                        self._error("Mismatched bracket")
+                    self.stack.pop()
+            self.pos += 1
+
+    def finish(self):
+        """Raises ValueError if the stream ended before the object was closed."""
+        if not self.closed:
+            self._error("Response ended before the JSON object was complete")
+        return self.buffer
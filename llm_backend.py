@@ -0,0 +1,121 @@
+import os
+import json
+import requests
+import openai
+
+# "openai" uses the hosted API; "local" talks to llm_standin.py (or anything OpenAI-compatible) at LLM_LOCAL_URL
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_LOCAL_URL = os.getenv("LLM_LOCAL_URL", "http://127.0.0.1:8765")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+
+class LLMBackendError(Exception):
+    pass
+
+
+class OpenAIChatCompletionBackend:
+    """Hosted OpenAI through the module-level openai.ChatCompletion API (autotrade_v2)."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def chat(self, messages):
+        return "".join(self.stream_chat(messages))
+
+    def stream_chat(self, messages):
+        try:
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                stream=True
+            )
+            try:
+                for chunk in response:
+                    content = chunk['choices'][0]['delta'].get('content')
+                    if content:
+                        yield content
+            finally:
+                close = getattr(response, 'close', None)
+                if close:
+                    close()
+        except openai.error.OpenAIError as e:
+            raise LLMBackendError(str(e)) from e
+
+
+class OpenAIClientBackend:
+    """Hosted OpenAI through an OpenAI() client instance (autotrade)."""
+
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+
+    def chat(self, messages):
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            raise LLMBackendError(str(e)) from e
+        return response.choices[0].message.content
+
+    def stream_chat(self, messages):
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                stream=True
+            )
+            for chunk in response:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    yield content
+        except Exception as e:
+            raise LLMBackendError(str(e)) from e
+
+
+class LocalBackend:
+    """OpenAI-compatible HTTP endpoint without authentication, e.g. the llm_standin.py stand-in."""
+
+    def __init__(self, url=LLM_LOCAL_URL, model="standin", timeout=LLM_TIMEOUT):
+        self.url = url.rstrip('/') + "/v1/chat/completions"
+        self.model = model
+        self.timeout = timeout
+
+    def chat(self, messages):
+        try:
+            response = requests.post(self.url, json={"model": self.model, "messages": messages}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+        except (requests.RequestException, KeyError, ValueError) as e:
+            raise LLMBackendError(str(e)) from e
+
+    def stream_chat(self, messages):
+        try:
+            with requests.post(self.url, json={"model": self.model, "messages": messages, "stream": True},
+                               timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    data = line[len("data: "):]
+                    if data == "[DONE]":
+                        break
+                    content = json.loads(data)['choices'][0]['delta'].get('content')
+                    if content:
+                        yield content
+        except (requests.RequestException, KeyError, ValueError) as e:
+            raise LLMBackendError(str(e)) from e
+
+
+def get_backend(hosted_backend, name=LLM_BACKEND):
+    """Returns `hosted_backend` unless LLM_BACKEND selects the local stand-in."""
+    if name == "local":
+        print(f"Using local LLM backend at {LLM_LOCAL_URL}")
+        return LocalBackend()
+    if name != "openai":
+        raise ValueError(f"Unknown LLM backend: {name}")
+    return hosted_backend
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "300"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "128"))
+# Significant digits numbers are rounded to before hashing, so near-identical snapshots share a key; 0 = exact
+LLM_CACHE_TOLERANCE = int(os.getenv("LLM_CACHE_TOLERANCE", "0"))
+
+# Scalar fields that change on every request without changing the market picture (request times, order
+# book sizes, the fear and greed countdown). Lists under these names are data, e.g. a payload's bar timestamps.
+VOLATILE_KEYS = {'timestamp', 'current_time', 'time_until_update', 'total_ask_size', 'total_bid_size', 'ask_size', 'bid_size'}
+
+
+def _volatile(key, value):
+    return key in VOLATILE_KEYS and not isinstance(value, (list, tuple))
+
+
+def normalize(value, digits=0):
+    """Canonical form of the prompt inputs: JSON strings parsed, volatile keys dropped, floats rounded."""
+    if isinstance(value, str):
+        if value[:1] in ('{', '['):
+            try:
+                return normalize(json.loads(value), digits)
+            except ValueError:
+                pass
+        return value
+    if isinstance(value, dict):
+        return {str(k): normalize(v, digits) for k, v in sorted(value.items(), key=lambda item: str(item[0])) if not _volatile(k, v)}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v, digits) for v in value]
+    if isinstance(value, float) and digits:
+        return float(f"{value:.{digits}g}")
+    return value
+
+
+class ResponseCache:
+    """Content-addressed LRU cache of LLM responses with a TTL and hit-rate accounting."""
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_SIZE, tolerance=LLM_CACHE_TOLERANCE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, response)
+        self._lock = threading.Lock()
+
+    def key(self, *inputs):
+        canonical = json.dumps(normalize(list(inputs), self.tolerance), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return f"hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate():.1%}, entries={len(self._entries)}"
@@ -0,0 +1,175 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint.
+Returns canned or rule-based decision JSON with configurable latency, so trading cycles can be
+run and benchmarked offline:
+
+    python llm_standin.py --port 8765 --latency 2.0
+    LLM_BACKEND=local python autotrade_v2.py --mode test
+"""
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import payload_encoder
+
+RSI_BUY_BELOW = 30
+RSI_SELL_ABOVE = 70
+
+
+def _is_payload(value):
+    return (isinstance(value, dict) and ('columns' in value or 'daily' in value)) or \
+        (isinstance(value, str) and value.startswith('interval,'))
+
+
+def _find_market_data(messages):
+    # The market data message is a JSON object keyed by ticker, each value an encoded payload
+    for message in messages:
+        if message.get('role') != 'user':
+            continue
+        try:
+            data = json.loads(message['content'])
+        except (TypeError, ValueError):
+            continue
+        if isinstance(data, dict) and data and all(str(key).startswith("KRW-") and _is_payload(v) for key, v in data.items()):
+            return data
+    return {}
+
+
+def _find_portfolio_request(messages):
+    # autotrade.py sends one unlabeled payload (its first coin's) and a status object keyed by coin
+    payload, coins = None, []
+    for message in messages:
+        if message.get('role') != 'user':
+            continue
+        try:
+            data = json.loads(message['content'])
+        except (TypeError, ValueError):
+            continue
+        if payload is None and _is_payload(data):
+            payload = data
+        elif isinstance(data, dict) and data and all(isinstance(v, dict) and 'orderbook' in v for v in data.values()):
+            coins = list(data)
+    return payload, coins
+
+
+def rule_based_decisions(messages):
+    """
+    RSI rule on the latest daily bar of each ticker: buy when oversold, sell when overbought.
+    Answers in the shape the caller parses: {ticker: decision} for autotrade_v2's per-ticker
+    market data, {"decisions": ..., "investment_strategy": ...} for autotrade.py's request.
+    """
+    data = _find_market_data(messages)
+    if data:
+        return decide_from_market_data(data)
+    payload, coins = _find_portfolio_request(messages)
+    return portfolio_decisions(payload, coins)
+
+
+def portfolio_decisions(payload, coins):
+    """The RSI rule in autotrade.py's response schema; coins without market data are held."""
+    decisions = decide_from_market_data({coins[0]: payload}) if payload is not None and coins else {}
+    held = {"decision": "hold", "percentage": 0, "reason": "No market data for a rule-based decision."}
+    decisions = {coin: decisions.get(coin, held) for coin in coins}
+    return {
+        "decisions": {coin: {"decision": d["decision"], "reason": d["reason"]} for coin, d in decisions.items()},
+        "investment_strategy": {
+            "buying_ratios": {coin: f"{d['percentage'] if d['decision'] == 'buy' else 0}%" for coin, d in decisions.items()},
+            "rationale": "Rule-based stand-in: RSI_14 thresholds on the latest daily bar.",
+        },
+    }
+
+
+def decide_from_market_data(data):
+    """The RSI rule applied to {ticker: encoded payload}, e.g. fetch_and_prepare_data results."""
+    frames = {}
+    for ticker, payload in data.items():
+        try:
+            frames[ticker] = payload_encoder.decode_frames(payload)
+        except (KeyError, IndexError, ValueError):
+            frames[ticker] = {}
+    return decide_from_frames(frames)
+
+
+def decide_from_frames(frames):
+    """The RSI rule applied to {ticker: {'daily': DataFrame, ...}}, e.g. autotrade_v2.prepare_frames results."""
+    decisions = {}
+    for ticker, ticker_frames in frames.items():
+        try:
+            rsi = ticker_frames['daily']['RSI_14'].to_numpy(dtype=float)
+            rsi = float(rsi[~np.isnan(rsi)][-1])
+        except (KeyError, IndexError, ValueError):
+            decisions[ticker] = {"decision": "hold", "percentage": 0, "reason": "Not enough data for a rule-based decision."}
+            continue
+        if rsi < RSI_BUY_BELOW:
+            decisions[ticker] = {"decision": "buy", "percentage": 20, "reason": f"RSI_14 {rsi:.1f} is oversold."}
+        elif rsi > RSI_SELL_ABOVE:
+            decisions[ticker] = {"decision": "sell", "percentage": 50, "reason": f"RSI_14 {rsi:.1f} is overbought."}
+        else:
+            decisions[ticker] = {"decision": "hold", "percentage": 0, "reason": f"RSI_14 {rsi:.1f} is neutral."}
+    return decisions
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    jitter = 0.0
+    chunk_size = 16
+    canned = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+        time.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+        decisions = self.canned if self.canned is not None else rule_based_decisions(body.get('messages', []))
+        content = json.dumps(decisions)
+        model = body.get('model', 'standin')
+
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for i in range(0, len(content), self.chunk_size):
+                chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": content[i:i + self.chunk_size]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+
+        response = json.dumps({
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+
+def serve(host="127.0.0.1", port=8765, latency=0.0, jitter=0.0, decisions_path=None):
+    StandinHandler.latency = latency
+    StandinHandler.jitter = jitter
+    if decisions_path:
+        with open(decisions_path, "r", encoding="utf-8") as file:
+            StandinHandler.canned = json.load(file)
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    print(f"LLM stand-in listening on http://{host}:{port} (latency {latency}s ± {jitter}s)")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='로컬 LLM 대체 서버')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='응답 지연 (초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='응답 지연 편차 (초)')
+    parser.add_argument('--decisions', type=str, default=None, help='고정 응답 JSON 파일 경로 (없으면 RSI 규칙 사용)')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.latency, args.jitter, args.decisions).serve_forever()
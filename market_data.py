@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+import pyupbit
+
+# Seconds a fetched price/orderbook is reused before hitting Upbit again
+CACHE_TTL = float(os.getenv("MARKET_DATA_TTL", "2"))
+
+_lock = threading.Lock()
+_price_cache = {}      # ticker -> (fetched_at, trade_price)
+_orderbook_cache = {}  # ticker -> (fetched_at, orderbook)
+_in_flight = {}  # (id(cache), ticker) -> Future of the request fetching it; concurrent misses wait on it
+_feed = None  # ws_feed.MarketFeed; fresh entries from it are served without any request
+
+
+def attach_feed(feed):
+    global _feed
+    _feed = feed
+
+
+def get_candles(ticker, interval):
+    """Candles built from the attached feed's trades, or None without a feed."""
+    return _feed.get_candles(ticker, interval) if _feed is not None else None
+
+
+def _fetch_prices(tickers):
+    prices = pyupbit.get_current_price(tickers)
+    # pyupbit returns a bare float when only one ticker is requested
+    if not isinstance(prices, dict):
+        prices = {tickers[0]: prices}
+    return prices
+
+
+def _fetch_orderbooks(tickers):
+    orderbooks = pyupbit.get_orderbook(tickers)
+    if isinstance(orderbooks, dict):
+        orderbooks = [orderbooks]
+    return {orderbook['market']: orderbook for orderbook in orderbooks}
+
+
+def _get_cached(cache, tickers, fetch, ttl):
+    tickers = list(dict.fromkeys(tickers))
+    now = time.monotonic()
+    owned, waiting = [], set()
+    with _lock:
+        for ticker in tickers:
+            if ticker in cache and now - cache[ticker][0] < ttl:
+                continue
+            pending = _in_flight.get((id(cache), ticker))
+            if pending is not None:
+                waiting.add(pending)  # another caller's request already covers it
+            else:
+                owned.append(ticker)
+        if owned:
+            request = Future()
+            for ticker in owned:
+                _in_flight[(id(cache), ticker)] = request
+    if owned:
+        # One request for every ticker that is not cached (or has expired) and not already being fetched
+        try:
+            fetched = fetch(owned)
+            with _lock:
+                for ticker, value in fetched.items():
+                    cache[ticker] = (now, value)
+        except BaseException as e:
+            request.set_exception(e)
+            raise
+        else:
+            request.set_result(None)
+        finally:
+            with _lock:
+                for ticker in owned:
+                    _in_flight.pop((id(cache), ticker), None)
+    for pending in waiting:
+        pending.result()  # raises the other request's error, as if this caller had made it
+    with _lock:
+        return {t: cache[t][1] for t in tickers if t in cache}
+
+
+def _get_live(feed_lookup, cache, tickers, fetch, ttl):
+    tickers = list(dict.fromkeys(tickers))
+    values = feed_lookup(tickers) if _feed is not None else {}
+    missing = [t for t in tickers if t not in values]
+    if missing:
+        # Tickers the feed has no fresh entry for (or no feed at all) go through the REST cache
+        values.update(_get_cached(cache, missing, fetch, ttl))
+    return {t: values[t] for t in tickers if t in values}
+
+
+def get_prices(tickers, ttl=CACHE_TTL):
+    """Returns {ticker: trade_price} for all tickers using at most one request."""
+    return _get_live(lambda t: _feed.get_prices(t), _price_cache, tickers, _fetch_prices, ttl)
+
+
+def get_orderbooks(tickers, ttl=CACHE_TTL):
+    """Returns {ticker: orderbook} for all tickers using at most one request."""
+    return _get_live(lambda t: _feed.get_orderbooks(t), _orderbook_cache, tickers, _fetch_orderbooks, ttl)
+
+
+def get_current_price(ticker, ttl=CACHE_TTL):
+    return get_prices([ticker], ttl).get(ticker)
+
+
+def get_orderbook(ticker, ttl=CACHE_TTL):
+    return get_orderbooks([ticker], ttl).get(ticker)
+
+
+def get_ask_prices(tickers, ttl=CACHE_TTL):
+    """Returns {ticker: best ask price} from the batched orderbook fetch."""
+    orderbooks = get_orderbooks(tickers, ttl)
+    return {ticker: orderbook['orderbook_units'][0]["ask_price"] for ticker, orderbook in orderbooks.items()}
+
+
+def get_ask_price(ticker, ttl=CACHE_TTL):
+    return get_ask_prices([ticker], ttl).get(ticker)
@@ -0,0 +1,93 @@
+import os
+import time
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+
+ORDER_POLL_INITIAL = float(os.getenv("ORDER_POLL_INITIAL", "0.2"))  # first poll delay (seconds)
+ORDER_POLL_MAX = float(os.getenv("ORDER_POLL_MAX", "5"))  # backoff cap
+ORDER_POLL_TIMEOUT = float(os.getenv("ORDER_POLL_TIMEOUT", "60"))  # give up and report the last seen state
+# Upbit market buys end as 'cancel' once the leftover funds are returned, so both count as final
+TERMINAL_STATES = {'done', 'cancel'}
+
+
+@dataclass
+class Fill:
+    uuid: str
+    market: str
+    side: str
+    state: str
+    executed_volume: float  # coins bought/sold
+    funds: float  # KRW value of the executed trades, before fees
+    avg_price: float
+    paid_fee: float
+    order: dict = field(repr=False, default_factory=dict)
+
+    @property
+    def complete(self):
+        return self.state in TERMINAL_STATES
+
+    @classmethod
+    def from_order(cls, uuid, order):
+        executed_volume = float(order.get('executed_volume') or 0)
+        trades = order.get('trades') or []
+        funds = sum(float(trade['funds']) for trade in trades)
+        if not funds and executed_volume and not trades:
+            funds = executed_volume * float(order.get('price') or 0)  # limit order without the trade list
+        return cls(
+            uuid=uuid,
+            market=order.get('market', ''),
+            side=order.get('side', ''),
+            state=order.get('state', 'unknown'),
+            executed_volume=executed_volume,
+            funds=funds,
+            avg_price=funds / executed_volume if executed_volume else 0.0,
+            paid_fee=float(order.get('paid_fee') or 0),
+            order=order,
+        )
+
+
+class OrderTracker:
+    """
+    Polls outstanding orders on worker threads with exponential backoff until they reach a
+    terminal state, so several orders can be in flight without blocking each other.
+    track() returns a Future resolving to the order's Fill.
+    """
+
+    def __init__(self, upbit, max_workers=8, initial_delay=ORDER_POLL_INITIAL, max_delay=ORDER_POLL_MAX, timeout=ORDER_POLL_TIMEOUT):
+        self.upbit = upbit
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="order-tracker")
+
+    def track(self, uuid, on_fill=None):
+        """
+        Starts polling `uuid`; on_fill(fill) is called from the worker once it is final (or timed out),
+        before the returned Future resolves, so whoever waits on it also sees on_fill's effects.
+        """
+        return self._executor.submit(self._poll, uuid, on_fill)
+
+    def _poll(self, uuid, on_fill=None):
+        deadline = time.monotonic() + self.timeout
+        delay = self.initial_delay
+        order = {}
+        while True:
+            time.sleep(delay)
+            try:
+                response = self.upbit.get_order(uuid)
+                if isinstance(response, dict) and 'error' not in response:
+                    order = response
+            except Exception as e:
+                print(f"주문 조회 실패 ({uuid}): {e}")
+            if order.get('state') in TERMINAL_STATES or time.monotonic() + delay > deadline:
+                break
+            delay = min(delay * 2, self.max_delay)
+        fill = Fill.from_order(uuid, order)
+        if not fill.complete:
+            print(f"주문 {uuid}이(가) {self.timeout:.0f}초 안에 종료되지 않았습니다. 마지막 상태: {fill.state}")
+        if on_fill is not None:
+            try:
+                on_fill(fill)
+            except Exception as e:
+                print(f"체결 알림 처리 실패 ({uuid}): {e}")
+        return fill
@@ -0,0 +1,144 @@
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+FORMATS = ('split', 'columns', 'csv')
+# 'split' keeps the layout described in the instructions (columns / index / data)
+PAYLOAD_FORMAT = os.getenv("LLM_PAYLOAD_FORMAT", "split")
+# Significant digits kept for every float; 0 keeps full precision
+PAYLOAD_PRECISION = int(os.getenv("LLM_PAYLOAD_PRECISION", "6"))
+
+_encoding = None
+
+
+def _round(value, precision):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if precision and isinstance(value, float):
+        return float(f"{value:.{precision}g}")
+    return value
+
+
+def _rows(df, precision):
+    values = df.to_numpy(dtype=object)
+    return [[_round(v, precision) for v in row] for row in values]
+
+
+def _timestamps(df):
+    # Epoch milliseconds, as produced by DataFrame.to_json
+    return [int(ts.value // 1_000_000) for ts in pd.DatetimeIndex(df.index)]
+
+
+def encode_frames(frames, fmt=PAYLOAD_FORMAT, precision=PAYLOAD_PRECISION):
+    """
+    Encodes {label: DataFrame} (e.g. {'daily': df_daily, 'hourly': df_hourly}) into a JSON-ready object.
+    - split:   {"columns": [...], "index": [[label, ts], ...], "data": [[...], ...]}
+    - columns: {label: {"timestamp": [...], column: [...], ...}}
+    - csv:     "label,timestamp,col1,..." header followed by one line per bar
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown payload format: {fmt}")
+    frames = {label: df.astype(float) for label, df in frames.items()}
+    columns = list(next(iter(frames.values())).columns) if frames else []
+
+    if fmt == 'split':
+        payload = {'columns': columns, 'index': [], 'data': []}
+        for label, df in frames.items():
+            payload['index'].extend([label, ts] for ts in _timestamps(df))
+            payload['data'].extend(_rows(df, precision))
+        return payload
+
+    if fmt == 'columns':
+        return {
+            label: {'timestamp': _timestamps(df), **{c: [_round(v, precision) for v in df[c].tolist()] for c in df.columns}}
+            for label, df in frames.items()
+        }
+
+    lines = [",".join(['interval', 'timestamp'] + columns)]
+    for label, df in frames.items():
+        for ts, row in zip(_timestamps(df), _rows(df, precision)):
+            lines.append(",".join([label, str(ts)] + ["" if v is None else repr(v) for v in row]))
+    return "\n".join(lines)
+
+
+def decode_frames(payload):
+    """Inverse of encode_frames: returns {label: DataFrame} indexed by timestamp."""
+    if isinstance(payload, str):
+        header, *lines = payload.split("\n")
+        columns = header.split(",")[2:]
+        rows = {}
+        for line in lines:
+            label, ts, *values = line.split(",")
+            rows.setdefault(label, []).append((int(ts), [float(v) if v else np.nan for v in values]))
+        return {
+            label: pd.DataFrame([v for _, v in items], columns=columns, index=pd.to_datetime([ts for ts, _ in items], unit='ms'))
+            for label, items in rows.items()
+        }
+    if 'columns' in payload and 'data' in payload:
+        rows = {}
+        for (label, ts), values in zip(payload['index'], payload['data']):
+            rows.setdefault(label, []).append((ts, values))
+        return {
+            label: pd.DataFrame([v for _, v in items], columns=payload['columns'], index=pd.to_datetime([ts for ts, _ in items], unit='ms')).astype(float)
+            for label, items in rows.items()
+        }
+    frames = {}
+    for label, data in payload.items():
+        data = dict(data)
+        index = pd.to_datetime(data.pop('timestamp'), unit='ms')
+        frames[label] = pd.DataFrame(data, index=index).astype(float)
+    return frames
+
+
+def trim_payload(payload, label, keep):
+    """Keeps only the newest `keep` bars of `label` (e.g. 'hourly') in an encoded payload."""
+    if isinstance(payload, str):
+        header, *lines = payload.split("\n")
+        labelled = [line for line in lines if line.startswith(f"{label},")]
+        dropped = set(labelled[:max(len(labelled) - keep, 0)])
+        return "\n".join([header] + [line for line in lines if line not in dropped])
+    if 'columns' in payload and 'data' in payload:
+        positions = [i for i, (l, _) in enumerate(payload['index']) if l == label]
+        dropped = set(positions[:max(len(positions) - keep, 0)])
+        return {
+            'columns': payload['columns'],
+            'index': [v for i, v in enumerate(payload['index']) if i not in dropped],
+            'data': [v for i, v in enumerate(payload['data']) if i not in dropped],
+        }
+    trimmed = dict(payload)
+    if label in trimmed:
+        trimmed[label] = {column: values[-keep:] if keep else [] for column, values in trimmed[label].items()}
+    return trimmed
+
+
+def dumps(payload):
+    """Single-level compact JSON (no double encoding, no padding whitespace)."""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+
+
+def estimate_tokens(text):
+    global _encoding, tiktoken
+    if tiktoken is not None and _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"tiktoken encoding unavailable, estimating token counts: {e}")
+            tiktoken = None
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # Conservative fallback when tiktoken is not installed: about 4 ASCII characters per token,
+    # and a token per other character (Hangul runs close to one o200k token per character)
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def payload_size(text):
+    """Returns (bytes, tokens) for an encoded payload string."""
+    return len(text.encode('utf-8')), estimate_tokens(text)
@@ -0,0 +1,78 @@
+import os
+import time
+import threading
+
+# Local rules evaluated by the fast price loop (percentages)
+STOP_LOSS_PCT = float(os.getenv("STOP_LOSS_PCT", "5"))  # sell when price falls this far below the average buy price
+TAKE_PROFIT_PCT = float(os.getenv("TAKE_PROFIT_PCT", "10"))  # sell when price rises this far above it
+GUARD_SELL_PERCENTAGE = float(os.getenv("GUARD_SELL_PERCENTAGE", "100"))  # share of the position a rule sells
+MOVE_TRIGGER_PCT = float(os.getenv("MOVE_TRIGGER_PCT", "3"))  # move since the last LLM cycle that triggers a new one
+FAST_LOOP_INTERVAL = int(os.getenv("FAST_LOOP_INTERVAL", "60"))
+# Seconds before the same ticker can fire a rule again / before another early LLM cycle
+GUARD_COOLDOWN = float(os.getenv("GUARD_COOLDOWN", "1800"))
+LLM_TRIGGER_COOLDOWN = float(os.getenv("LLM_TRIGGER_COOLDOWN", "900"))
+
+
+class PriceGuard:
+    """
+    Stop-loss / take-profit rules and large-move detection for the fast loop.
+    Only decides; the caller executes the sells and runs the LLM cycle.
+    """
+
+    def __init__(self, stop_loss_pct=STOP_LOSS_PCT, take_profit_pct=TAKE_PROFIT_PCT, move_trigger_pct=MOVE_TRIGGER_PCT,
+                 sell_percentage=GUARD_SELL_PERCENTAGE, cooldown=GUARD_COOLDOWN, trigger_cooldown=LLM_TRIGGER_COOLDOWN):
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.move_trigger_pct = move_trigger_pct
+        self.sell_percentage = sell_percentage
+        self.cooldown = cooldown
+        self.trigger_cooldown = trigger_cooldown
+        self.reference_prices = {}  # prices at the last LLM cycle
+        self._last_fired = {}  # ticker -> monotonic time of the last rule sell
+        self._last_trigger = None
+        self._lock = threading.Lock()
+
+    def set_reference(self, prices):
+        with self._lock:
+            self.reference_prices = {ticker: price for ticker, price in prices.items() if price}
+
+    def check_rules(self, prices, positions):
+        """
+        positions: {ticker: (coin_balance, avg_buy_price)}
+        Returns {ticker: (sell percentage, reason)} for every position that hit a rule.
+        """
+        now = time.monotonic()
+        sells = {}
+        with self._lock:
+            for ticker, (balance, avg_buy_price) in positions.items():
+                price = prices.get(ticker)
+                if not price or not balance or not avg_buy_price:
+                    continue
+                if now - self._last_fired.get(ticker, float('-inf')) < self.cooldown:
+                    continue
+                change = (price - avg_buy_price) / avg_buy_price * 100
+                if change <= -self.stop_loss_pct:
+                    reason = f"Stop-loss: price {price} is {change:.2f}% from the average buy price {avg_buy_price}."
+                elif change >= self.take_profit_pct:
+                    reason = f"Take-profit: price {price} is +{change:.2f}% from the average buy price {avg_buy_price}."
+                else:
+                    continue
+                self._last_fired[ticker] = now
+                sells[ticker] = (self.sell_percentage, reason)
+        return sells
+
+    def check_move(self, prices):
+        """Returns a reason string when any price moved enough since the last LLM cycle to warrant a new one."""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_trigger is not None and now - self._last_trigger < self.trigger_cooldown:
+                return None
+            for ticker, reference in self.reference_prices.items():
+                price = prices.get(ticker)
+                if not price:
+                    continue
+                move = (price - reference) / reference * 100
+                if abs(move) >= self.move_trigger_pct:
+                    self._last_trigger = now
+                    return f"{ticker} moved {move:+.2f}% since the last analysis ({reference} -> {price})"
+        return None
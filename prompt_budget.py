@@ -0,0 +1,62 @@
+import os
+import payload_encoder
+
+# Upper bound on prompt tokens (system instructions included)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "32000"))
+
+
+class PromptSection:
+    """
+    One user message of the prompt.
+    `variants` are progressively smaller renderings of the same data (strings or zero-argument
+    callables, rendered lazily); the first one is the full content. When the prompt is over
+    budget, the section with the lowest `priority` that can still shrink is trimmed first.
+    """
+
+    def __init__(self, name, variants, priority):
+        self.name = name
+        self.variants = list(variants)
+        self.priority = priority
+        self.level = 0
+        self._rendered = {}
+
+    def content(self):
+        if self.level not in self._rendered:
+            variant = self.variants[self.level]
+            self._rendered[self.level] = variant() if callable(variant) else variant
+        return self._rendered[self.level]
+
+    def can_trim(self):
+        return self.level < len(self.variants) - 1
+
+    def trim(self):
+        self.level += 1
+
+
+def build_messages(instructions, sections, budget=PROMPT_TOKEN_BUDGET):
+    """
+    Returns (messages, token_counts) with the system instructions followed by one user message
+    per section, trimming sections until the estimated token count fits the budget.
+    """
+    system_tokens = payload_encoder.estimate_tokens(instructions)
+    tokens = {section.name: payload_encoder.estimate_tokens(section.content()) for section in sections}
+
+    while system_tokens + sum(tokens.values()) > budget:
+        trimmable = [section for section in sections if section.can_trim()]
+        if not trimmable:
+            print(f"Prompt still exceeds the token budget ({budget}) after trimming every section.")
+            break
+        section = min(trimmable, key=lambda s: s.priority)
+        section.trim()
+        tokens[section.name] = payload_encoder.estimate_tokens(section.content())
+
+    total = system_tokens + sum(tokens.values())
+    report = ", ".join(
+        f"{section.name}={tokens[section.name]}" + (f" (trimmed x{section.level})" if section.level else "")
+        for section in sections
+    )
+    print(f"Prompt tokens: system={system_tokens}, {report}, total={total}/{budget}")
+
+    messages = [{"role": "system", "content": instructions}]
+    messages += [{"role": "user", "content": section.content()} for section in sections]
+    return messages, {'system': system_tokens, **tokens}
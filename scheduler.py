@@ -0,0 +1,198 @@
+import os
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# What to do with slots that were missed by more than the grace period (process suspended, clock jump, ...)
+#   skip: drop them; coalesce: run once for all of them; catchup: run once per missed slot, in order
+MISSED_POLICIES = ('skip', 'coalesce', 'catchup')
+# What to do with a slot that comes due while the previous run is still going
+#   skip: drop it; coalesce: run once after the current run (later slots replace earlier ones); parallel: run now
+OVERLAP_POLICIES = ('skip', 'coalesce', 'parallel')
+
+MISSED_POLICY = os.getenv("SCHEDULER_MISSED_POLICY", "coalesce")
+OVERLAP_POLICY = os.getenv("SCHEDULER_OVERLAP_POLICY", "skip")
+MISFIRE_GRACE = float(os.getenv("SCHEDULER_MISFIRE_GRACE", "300"))
+# Longest single sleep, so the timer re-reads the wall clock after suspends or clock changes
+MAX_SLEEP = 300
+LATENCY_HISTORY = 100
+
+
+def interval(seconds, anchor=None):
+    """Slots at anchor + k * seconds (anchor defaults to now, so the first slot is one interval away)."""
+    anchor = anchor or datetime.now()
+    step = timedelta(seconds=seconds)
+
+    def next_slot(after):
+        if after < anchor:
+            return anchor
+        return anchor + step * ((after - anchor) // step + 1)
+    return next_slot
+
+
+def daily_at(*times):
+    """Slots at the given local "HH:MM" times every day."""
+    clock = sorted(datetime.strptime(t, "%H:%M").time() for t in times)
+
+    def next_slot(after):
+        for day in range(2):
+            date = (after + timedelta(days=day)).date()
+            for t in clock:
+                slot = datetime.combine(date, t)
+                if slot > after:
+                    return slot
+    return next_slot
+
+
+class Job:
+    def __init__(self, func, trigger, name=None, missed=MISSED_POLICY, overlap=OVERLAP_POLICY, misfire_grace=MISFIRE_GRACE):
+        if missed not in MISSED_POLICIES:
+            raise ValueError(f"Unknown missed-run policy: {missed}")
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy: {overlap}")
+        self.func = func
+        self.trigger = trigger
+        self.name = name or func.__name__
+        self.missed = missed
+        self.overlap = overlap
+        self.misfire_grace = misfire_grace
+        self.next_run = trigger(datetime.now())
+        self.running = 0
+        self.pending = deque()
+        # (slot, start latency seconds, duration seconds, status) per run or dropped slot
+        self.history = deque(maxlen=LATENCY_HISTORY)
+        self.lock = threading.Lock()
+
+    def due_slots(self, now):
+        """Pops every slot that is due at `now` and applies the missed-run policy."""
+        slots = []
+        while self.next_run <= now:
+            slots.append(self.next_run)
+            self.next_run = self.trigger(self.next_run)
+        missed = [slot for slot in slots if (now - slot).total_seconds() > self.misfire_grace]
+        if not missed:
+            return slots
+        if self.missed == 'skip':
+            for slot in missed:
+                self.record(slot, None, None, 'missed')
+            print(f"[scheduler] {self.name}: skipped {len(missed)} missed slot(s), oldest {missed[0]:%Y-%m-%d %H:%M:%S}")
+            return [slot for slot in slots if slot not in missed]
+        if self.missed == 'coalesce':
+            if len(slots) > 1:
+                print(f"[scheduler] {self.name}: coalesced {len(slots)} slots into one run")
+            return slots[-1:]
+        return slots
+
+    def record(self, slot, latency, duration, status):
+        self.history.append((slot, latency, duration, status))
+
+    def latency_stats(self):
+        latencies = sorted(entry[1] for entry in self.history if entry[1] is not None)
+        if not latencies:
+            return f"{self.name}: no runs yet"
+        return (f"{self.name}: runs={len(latencies)}, "
+                f"start latency median={latencies[len(latencies) // 2]:.3f}s, max={latencies[-1]:.3f}s")
+
+
+class Scheduler:
+    """
+    Sleeps until the earliest job deadline instead of polling, and hands each run to a worker
+    thread so a slow job never delays the timer or other jobs.
+    """
+
+    def __init__(self, max_workers=4):
+        self.jobs = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler")
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def add_job(self, func, trigger, **options):
+        job = Job(func, trigger, **options)
+        self.jobs.append(job)
+        self._wake.set()
+        print(f"[scheduler] {job.name}: next run at {job.next_run:%Y-%m-%d %H:%M:%S} "
+              f"(missed={job.missed}, overlap={job.overlap})")
+        return job
+
+    def _run(self, job, slot):
+        started = datetime.now()
+        latency = (started - slot).total_seconds()
+        status = 'ok'
+        try:
+            job.func()
+        except Exception:
+            status = 'error'
+            print(f"[scheduler] {job.name} failed:\n{traceback.format_exc()}")
+        duration = (datetime.now() - started).total_seconds()
+        job.record(slot, latency, duration, status)
+        print(f"[scheduler] {job.name} slot {slot:%Y-%m-%d %H:%M:%S}: started {latency:.3f}s late, took {duration:.1f}s ({status})")
+
+    def _drain(self, job):
+        while True:
+            with job.lock:
+                if not job.pending:
+                    job.running -= 1
+                    return
+                slot = job.pending.popleft()
+            self._run(job, slot)
+
+    def _run_parallel(self, job, slot):
+        try:
+            self._run(job, slot)
+        finally:
+            with job.lock:
+                job.running -= 1
+
+    def _dispatch(self, job, slots):
+        with job.lock:
+            if job.overlap == 'parallel':
+                for slot in slots:
+                    job.running += 1
+                    self._executor.submit(self._run_parallel, job, slot)
+                return
+            if job.running:
+                if job.overlap == 'skip':
+                    for slot in slots:
+                        job.record(slot, None, None, 'overlap')
+                    print(f"[scheduler] {job.name}: previous run still in progress, skipped {len(slots)} slot(s)")
+                    return
+                # coalesce: whatever is waiting collapses into a single run of the newest slot
+                job.pending.clear()
+                job.pending.append(slots[-1])
+                return
+            job.pending.extend(slots)
+            job.running += 1
+            self._executor.submit(self._drain, job)
+
+    def run_now(self, job, reason=None):
+        """Runs `job` outside its schedule (e.g. on an external trigger), subject to its overlap policy."""
+        if reason:
+            print(f"[scheduler] {job.name}: triggered early ({reason})")
+        self._dispatch(job, [datetime.now()])
+
+    def run_pending(self, now=None):
+        now = now or datetime.now()
+        for job in self.jobs:
+            slots = job.due_slots(now)
+            if slots:
+                self._dispatch(job, slots)
+
+    def run_forever(self):
+        try:
+            while not self._stopped:
+                self.run_pending()
+                if not self.jobs:
+                    self._wake.wait()
+                else:
+                    next_run = min(job.next_run for job in self.jobs)
+                    timeout = min(max((next_run - datetime.now()).total_seconds(), 0), MAX_SLEEP)
+                    self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
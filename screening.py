@@ -0,0 +1,109 @@
+import os
+import logging
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from data_analysis import get_average_noise_ratio, get_daily_data_based_on_10am
+
+# The noise ratio below is the standard 1 - |close - open| / (high - low), averaged over NOISE_DAYS
+# daily bars. It is an assumed reconstruction of data_analysis.get_average_noise_ratio, whose source
+# is not in this repository; set SCREEN_NOISE_SOURCE=data_analysis to rank by that function instead
+# (exact, at the cost of its own fetch per coin).
+NOISE_DAYS = int(os.getenv("SCREEN_NOISE_DAYS", "20"))
+NOISE_SOURCE = os.getenv("SCREEN_NOISE_SOURCE", "vectorized")  # vectorized | data_analysis
+MA_DAYS = int(os.getenv("SCREEN_MA_DAYS", "5"))  # price / volume moving average window
+FETCH_WORKERS = int(os.getenv("SCREEN_FETCH_WORKERS", "4"))
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+@dataclass
+class DailyBars:
+    """Daily bars of several coins on one date axis: each field is a (coins, days) array, NaN where a coin has no bar."""
+    tickers: list
+    dates: pd.DatetimeIndex
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_frames(cls, frames, days):
+        tickers = [ticker for ticker, df in frames.items() if df is not None and len(df)]
+        dates = pd.DatetimeIndex([])
+        for ticker in tickers:
+            dates = dates.union(frames[ticker].index)
+        dates = dates[-days:]
+        arrays = {field: np.full((len(tickers), len(dates)), np.nan) for field in FIELDS}
+        for row, ticker in enumerate(tickers):
+            df = frames[ticker]
+            positions = dates.get_indexer(df.index)
+            present = positions >= 0
+            for field in FIELDS:
+                arrays[field][row, positions[present]] = df[field].to_numpy(dtype=float)[present]
+        return cls(tickers, dates, **arrays)
+
+
+def load_daily_bars(tickers, days, fetch=get_daily_data_based_on_10am, max_workers=FETCH_WORKERS):
+    """Fetches each coin's daily bars once (concurrently) and aligns them."""
+    def load(ticker):
+        try:
+            return fetch(ticker, days)
+        except Exception as e:
+            logging.error(f"Failed to load daily data for {ticker}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = dict(zip(tickers, executor.map(load, tickers)))
+    return DailyBars.from_frames(frames, days)
+
+
+def noise_ratios(bars, days=NOISE_DAYS):
+    """Average of 1 - |close - open| / (high - low) over the last `days` bars; NaN when a coin has none."""
+    body = np.abs(bars.close[:, -days:] - bars.open[:, -days:])
+    span = bars.high[:, -days:] - bars.low[:, -days:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        noise = np.where(span > 0, 1 - body / span, np.nan)
+        counts = np.sum(~np.isnan(noise), axis=1)
+        return np.where(counts > 0, np.nansum(noise, axis=1) / counts, np.nan)
+
+
+def price_above_ma(bars, days=MA_DAYS):
+    """Latest close above its `days`-day moving average (False without a full window)."""
+    window = bars.close[:, -days:]
+    if window.shape[1] < days:
+        return np.zeros(len(bars.tickers), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        return window[:, -1] > window.mean(axis=1)
+
+
+def volume_above_ma(bars, days=MA_DAYS):
+    """Previous day's volume above the `days`-day volume average ending that day."""
+    window = bars.volume[:, -days - 1:-1]
+    if window.shape[1] < days:
+        return np.zeros(len(bars.tickers), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        return window[:, -1] > window.mean(axis=1)
+
+
+def legacy_noise_ratios(bars):
+    """get_average_noise_ratio per coin, as the original select_coins ranked them."""
+    values = [get_average_noise_ratio(ticker) for ticker in bars.tickers]
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+def screen(bars, n=3, noise_days=NOISE_DAYS, ma_days=MA_DAYS, noise=None):
+    """Up to n tickers passing both MA filters, lowest average noise first (noise: precomputed per-coin ratios)."""
+    if noise is None:
+        noise = noise_ratios(bars, noise_days)
+    passed = price_above_ma(bars, ma_days) & volume_above_ma(bars, ma_days) & ~np.isnan(noise)
+    candidates = np.flatnonzero(passed)
+    order = candidates[np.argsort(noise[candidates], kind='stable')]
+    return [bars.tickers[i] for i in order[:n]]
+
+
+def select_coins(tickers, n=3, noise_days=NOISE_DAYS, ma_days=MA_DAYS, fetch=get_daily_data_based_on_10am, noise_source=NOISE_SOURCE):
+    bars = load_daily_bars(tickers, max(noise_days, ma_days + 1), fetch)
+    noise = legacy_noise_ratios(bars) if noise_source == 'data_analysis' else None
+    return screen(bars, n, noise_days, ma_days, noise)
@@ -0,0 +1,153 @@
+import os
+import time
+import queue
+import atexit
+import threading
+from collections import OrderedDict
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+# Point at slack_standin.py (e.g. http://127.0.0.1:8767/api/) to run without Slack
+SLACK_BASE_URL = os.getenv("SLACK_BASE_URL", WebClient.BASE_URL)
+SLACK_QUEUE_SIZE = int(os.getenv("SLACK_QUEUE_SIZE", "200"))
+# Seconds the first queued message waits for others before a batch is posted without an explicit flush()
+SLACK_BATCH_WINDOW = float(os.getenv("SLACK_BATCH_WINDOW", "5"))
+SLACK_MAX_RETRIES = int(os.getenv("SLACK_MAX_RETRIES", "5"))
+MAX_POST_LENGTH = 3500  # stay well under Slack's per-message limit
+
+_FLUSH = object()
+_CLOSE = object()
+
+
+class SlackNotifier:
+    """
+    Non-blocking Slack notifications. notify() only enqueues; a background thread groups the
+    queued messages per channel into one post, posts when flush() is called (end of a trading
+    cycle) or the batch window expires, and retries with Slack's Retry-After on rate limits.
+    When the queue is full new messages are dropped and the loss is reported in the next post.
+    """
+
+    def __init__(self, token=None, base_url=SLACK_BASE_URL, queue_size=SLACK_QUEUE_SIZE,
+                 batch_window=SLACK_BATCH_WINDOW, max_retries=SLACK_MAX_RETRIES):
+        self.client = WebClient(token=token or os.getenv('SLACK_BOT_TOKEN'), base_url=base_url, timeout=10)
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.dropped = 0
+        self.posted = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._drained = threading.Event()
+        self._drained.set()
+        self._flush_requested = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="slack-notifier", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def notify(self, channel, text):
+        """Queues a message without blocking; returns False if it was dropped."""
+        self._drained.clear()
+        try:
+            self._queue.put_nowait((channel, str(text)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"슬랙 알림 대기열이 가득 차 메시지를 버립니다: {text}")
+            return False
+
+    def flush(self, timeout=None):
+        """Posts everything queued so far now. With a timeout, waits (up to it) until it has been sent."""
+        self._drained.clear()
+        self._flush_requested.set()
+        try:
+            self._queue.put_nowait(_FLUSH)  # only wakes the worker
+        except queue.Full:
+            pass  # the worker is busy draining a full queue and sees the request once it is empty
+        if timeout is not None:
+            return self._drained.wait(timeout)
+        return True
+
+    def close(self, timeout=5):
+        if self._thread.is_alive():
+            self.flush(timeout)
+            try:
+                self._queue.put(_CLOSE, timeout=1)
+            except queue.Full:
+                pass
+
+    def _run(self):
+        batch = OrderedDict()  # channel -> [(text, repeat count)]
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+            if item is _CLOSE:
+                self._post_batch(batch)
+                self._drained.set()
+                return
+            if item is not _FLUSH:
+                channel, text = item
+                lines = batch.setdefault(channel, [])
+                # Coalesce repeats of the same message (e.g. one error raised for every coin)
+                if lines and lines[-1][0] == text:
+                    lines[-1] = (text, lines[-1][1] + 1)
+                else:
+                    lines.append((text, 1))
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_window
+            expired = deadline is not None and time.monotonic() >= deadline
+            if not expired and not (self._flush_requested.is_set() and self._queue.empty()):
+                continue
+            self._flush_requested.clear()
+            self._post_batch(batch)
+            batch = OrderedDict()
+            deadline = None
+            if self._queue.empty():
+                self._drained.set()
+
+    def _post_batch(self, batch):
+        if self.dropped:
+            channel = next(iter(batch), None)
+            if channel is not None:
+                batch[channel].append((f"(알림 {self.dropped}건이 대기열 초과로 누락되었습니다)", 1))
+                self.dropped = 0
+        for channel, lines in batch.items():
+            texts = [text if count == 1 else f"{text} (x{count})" for text, count in lines]
+            for chunk in _chunks(texts, MAX_POST_LENGTH):
+                self._post(channel, chunk)
+
+    def _post(self, channel, text):
+        delay = 1
+        for attempt in range(self.max_retries):
+            try:
+                self.client.chat_postMessage(channel=channel, text=text)
+                self.posted += 1
+                print(f"{channel}에 메시지 전송 완료: {text}")
+                return True
+            except SlackApiError as e:
+                if e.response.status_code != 429:
+                    print(f"슬랙 메시지 전송 실패: {e.response['error']}")
+                    return False
+                wait = float(e.response.headers.get('Retry-After', delay))
+                print(f"슬랙 전송 속도 제한, {wait:.0f}초 후 재시도합니다.")
+            except Exception as e:
+                wait = delay
+                print(f"슬랙 메시지 전송 실패 ({e}), {wait:.0f}초 후 재시도합니다.")
+            time.sleep(wait)
+            delay = min(delay * 2, 60)
+        print(f"슬랙 메시지 전송을 {self.max_retries}회 시도 후 포기합니다: {text}")
+        return False
+
+
+def _chunks(texts, limit):
+    chunk = []
+    length = 0
+    for text in texts:
+        if chunk and length + len(text) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, length = [], 0
+        chunk.append(text)
+        length += len(text) + 1
+    if chunk:
+        yield "\n".join(chunk)
@@ -0,0 +1,77 @@
+"""
+Local stand-in for the Slack Web API's chat.postMessage, for exercising the notifier offline:
+
+    python slack_standin.py --port 8767 --latency 0.5 --rate-limit-every 3
+    SLACK_BASE_URL=http://127.0.0.1:8767/api/ python autotrade_v2.py --mode test
+"""
+import json
+import time
+import argparse
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SlackStandinHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    rate_limit_every = 0  # answer every Nth request with 429; 0 disables
+    retry_after = 1
+    messages = []  # (channel, text) of every accepted post
+    _count = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith("/chat.postMessage"):
+            self._reply(404, {"ok": False, "error": "unknown_method"})
+            return
+        raw = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(raw or "{}")
+        else:
+            params = {key: values[0] for key, values in parse_qs(raw).items()}
+        time.sleep(self.latency)
+
+        with self._lock:
+            SlackStandinHandler._count += 1
+            limited = self.rate_limit_every and SlackStandinHandler._count % self.rate_limit_every == 0
+            if not limited:
+                self.messages.append((params.get('channel'), params.get('text')))
+        if limited:
+            self._reply(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(self.retry_after)})
+            return
+        print(f"[{params.get('channel')}] {params.get('text')}")
+        self._reply(200, {"ok": True, "channel": params.get('channel'), "ts": f"{time.time():.6f}"})
+
+
+def serve(host="127.0.0.1", port=8767, latency=0.0, rate_limit_every=0, retry_after=1):
+    SlackStandinHandler.latency = latency
+    SlackStandinHandler.rate_limit_every = rate_limit_every
+    SlackStandinHandler.retry_after = retry_after
+    server = ThreadingHTTPServer((host, port), SlackStandinHandler)
+    print(f"Slack stand-in listening on http://{host}:{port}/api/")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='로컬 슬랙 API 대체 서버')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--latency', type=float, default=0.0, help='응답 지연 (초)')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='N번째 요청마다 429 응답 (0이면 사용 안 함)')
+    parser.add_argument('--retry-after', type=int, default=1, help='429 응답의 Retry-After (초)')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.latency, args.rate_limit_every, args.retry_after).serve_forever()
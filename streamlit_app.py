@@ -1,38 +1,118 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 from datetime import datetime
-import pyupbit
+import market_data
+import decision_store
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 DB_PATH = os.getenv("DB_PATH", "trading_decisions.sqlite")
-
-def load_data(ticker):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT timestamp, decision, percentage, reason, coin_balance, krw_balance, coin_avg_buy_price, coin_price FROM decisions WHERE ticker = ? ORDER BY timestamp", (ticker,))
-        decisions = cursor.fetchall()
-        df = pd.DataFrame(decisions, columns=['timestamp', 'decision', 'percentage', 'reason', 'coin_balance', 'krw_balance', 'coin_avg_buy_price', 'coin_price'])
-        df['ticker'] = ticker
-        return df
-
-def get_latest_state(db_path):
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT ticker, MAX(timestamp) AS max_timestamp FROM decisions GROUP BY ticker")
-        latest_timestamps = cursor.fetchall()
-        total_krw_balance = 0
-        total_coin_balance = {'BTC': 0.0, 'SOL': 0.0, 'XRP': 0.0}
-        for ticker, max_timestamp in latest_timestamps:
-            cursor.execute("SELECT coin_balance, krw_balance FROM decisions WHERE ticker = ? AND timestamp = ? LIMIT 1", (ticker, max_timestamp))
-            row = cursor.fetchone()
-            coin_balance = row[0]
-            krw_balance = row[1]
-            total_krw_balance = krw_balance
-            total_coin_balance[ticker.split('-')[1]] = coin_balance
-        return total_krw_balance, total_coin_balance
+LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+# 대시보드용 호가 캐시 유효 시간 (초)
+PRICE_TTL = float(os.getenv("DASHBOARD_PRICE_TTL", "5"))
+# 메모리에 유지하는 최근 거래 내역 행 수와 이전 기록 페이지 크기
+RECENT_ROWS = int(os.getenv("DASHBOARD_RECENT_ROWS", "500"))
+PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "200"))
+HISTORY_COLUMNS = ['id', 'timestamp', 'ticker', 'decision', 'percentage', 'reason', 'coin_balance', 'krw_balance', 'coin_avg_buy_price', 'coin_price']
+
+def get_data_version(db_path):
+    # 새 결정이 기록될 때만 바뀌므로 캐시 무효화 키로 사용합니다.
+    return decision_store.query("SELECT MAX(id) FROM decisions", db_path=db_path)[0][0] or 0
+
+def load_rows(db_path, **filters):
+    df = pd.DataFrame(decision_store.history_columns(columns=HISTORY_COLUMNS, db_path=db_path, **filters))
+    # 저장된 epoch 밀리초를 로컬 시간으로 변환합니다.
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True).dt.tz_convert(LOCAL_TZ)
+    return df
+
+class RecentHistory:
+    """
+    모든 세션이 공유하는 최근 거래 내역입니다.
+    처음에는 최신 RECENT_ROWS 행만 읽고, 이후에는 마지막으로 읽은 id보다 새로운 행만 추가합니다.
+    """
+
+    def __init__(self, db_path, max_rows=RECENT_ROWS):
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self.df = None
+        self.last_id = 0
+        self.lock = threading.Lock()
+
+    def refresh(self, version):
+        with self.lock:
+            if self.df is None:
+                self.df = load_rows(self.db_path, limit=self.max_rows)
+            elif version > self.last_id:
+                # 어차피 max_rows 행만 유지하므로 새 행도 최신 max_rows 행까지만 읽습니다 (처음 DB가 비어 있어 last_id = 0인 경우 포함).
+                new_rows = load_rows(self.db_path, after_id=self.last_id, limit=self.max_rows)
+                # 새 DataFrame을 만들어 교체하므로 이전 객체를 보고 있는 세션에는 영향이 없습니다.
+                self.df = pd.concat([self.df, new_rows], ignore_index=True).iloc[-self.max_rows:].reset_index(drop=True)
+            if not self.df.empty:
+                # 행 순서(timestamp)가 id 순서와 다를 수 있으므로 마지막 행이 아니라 가장 큰 id를 기준으로 합니다.
+                self.last_id = int(self.df['id'].max())
+            return self.df
+
+@st.cache_resource
+def get_recent_history(db_path):
+    return RecentHistory(db_path)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_older_page(db_path, before_id, page_size=PAGE_SIZE):
+    # before_id 이전의 기록은 바뀌지 않으므로 버전 없이 캐시합니다.
+    return load_rows(db_path, before_id=before_id, limit=page_size)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_latest_rows(db_path, version):
+    # 티커별 최신 행을 (ticker, timestamp) 인덱스 탐색만으로 조회합니다: 티커 목록은 MIN(ticker > 이전 티커)로
+    # 건너뛰며 찾고, 티커마다 timestamp 역순으로 한 행만 읽으므로 테이블 크기와 관계없이 시간이 일정합니다.
+    latest_rows = decision_store.query(
+        """
+        WITH RECURSIVE tickers(ticker) AS (
+            SELECT MIN(ticker) FROM decisions
+            UNION ALL
+            SELECT (SELECT MIN(ticker) FROM decisions WHERE ticker > tickers.ticker) FROM tickers WHERE ticker IS NOT NULL
+        )
+        SELECT d.ticker, d.timestamp, d.coin_balance, d.krw_balance, d.coin_avg_buy_price, d.id
+        FROM tickers JOIN decisions d ON d.id = (
+            SELECT id FROM decisions WHERE ticker = tickers.ticker ORDER BY timestamp DESC, id DESC LIMIT 1)
+        """,
+        db_path=db_path)
+    df = pd.DataFrame(latest_rows, columns=['ticker', 'timestamp', 'coin_balance', 'krw_balance', 'coin_avg_buy_price', 'id'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True).dt.tz_convert(LOCAL_TZ)
+    return df.sort_values(by='id', ignore_index=True)
+
+def get_latest_state(latest_rows):
+    total_coin_balance = {'BTC': 0.0, 'SOL': 0.0, 'XRP': 0.0}
+    for ticker, coin_balance in zip(latest_rows['ticker'], latest_rows['coin_balance']):
+        total_coin_balance[ticker.split('-')[1]] = coin_balance
+    # 원화 잔고는 가장 최근에 기록된 결정의 값을 사용합니다.
+    total_krw_balance = latest_rows['krw_balance'].iloc[-1] if not latest_rows.empty else 0
+    return total_krw_balance, total_coin_balance
+
+def build_summary(latest_rows, ask_prices, total_start_value):
+    # 현재가 기반 파생 값은 티커마다 한 번만 계산합니다 (거래 내역 행마다 반복하지 않음).
+    now = pd.Timestamp.now(tz=LOCAL_TZ)
+    summary = []
+    for row in latest_rows.itertuples(index=False):
+        current_price = ask_prices[row.ticker]
+        current_value = int(row.coin_balance * current_price + row.krw_balance)
+        time_diff = now - row.timestamp
+        summary.append({
+            '티커': row.ticker,
+            '수익률': 0.0 if row.coin_balance == 0 else round((current_value - total_start_value) / total_start_value * 100, 2),
+            '현재 시각': now,
+            '투자기간': f"{time_diff.days} 일 {time_diff.seconds // 3600} 시간 {(time_diff.seconds % 3600) // 60} 분",
+            '시작 원금': total_start_value,
+            '현재 코인 가격': current_price,
+            '현재 보유 현금': row.krw_balance,
+            '현재 보유 코인': row.coin_balance,
+            '매수 평균가격': row.coin_avg_buy_price,
+            '현재 원화 가치 평가': current_value,
+        })
+    return pd.DataFrame(summary)
 
 def main():
     st.set_page_config(layout="wide")
@@ -41,53 +121,37 @@ def main():
 
     tickers = ["KRW-BTC", "KRW-SOL", "KRW-XRP"]
     total_start_value = 638506.36888986  # 전체 시작 원금을 설정합니다.
-    total_current_value = 0  # 전체 현재 가치를 계산할 변수
-
-    all_dfs = []
-    total_krw_balance, total_coin_balance = get_latest_state(DB_PATH)
-
-    for ticker in tickers:
-        df = load_data(ticker)
-        if not df.empty:
-            current_price = pyupbit.get_orderbook(ticker=ticker)['orderbook_units'][0]["ask_price"]
-            latest_row = df.iloc[-1]
-            coin_balance = latest_row['coin_balance']
-            krw_balance = latest_row['krw_balance']
-            coin_avg_buy_price = latest_row['coin_avg_buy_price']
-            current_value = int(coin_balance * current_price + krw_balance)
-            total_current_value += current_value  # 전체 현재 가치에 더합니다.
-
-            time_diff = datetime.now() - pd.to_datetime(latest_row['timestamp'])
-            days = time_diff.days
-            hours = time_diff.seconds // 3600
-            minutes = (time_diff.seconds % 3600) // 60
-
-            if coin_balance == 0:
-                df['수익률'] = 0.0
-            else:
-                df['수익률'] = round((current_value - total_start_value) / total_start_value * 100, 2)
-
-            df['현재 시각'] = datetime.now()
-            df['투자기간'] = f"{days} 일 {hours} 시간 {minutes} 분"
-            df['시작 원금'] = total_start_value
-            df['현재 코인 가격'] = current_price
-            df['현재 보유 현금'] = krw_balance
-            df['현재 보유 코인'] = coin_balance
-            df['매수 평균가격'] = coin_avg_buy_price
-            df['현재 원화 가치 평가'] = current_value
-
-            all_dfs.append(df)
-
-    combined_df = pd.concat(all_dfs, ignore_index=True)
-    combined_df = combined_df.sort_values(by='timestamp')
+
+    version = get_data_version(DB_PATH)
+    recent = get_recent_history(DB_PATH).refresh(version)
+    latest_rows = load_latest_rows(DB_PATH, version)
+    latest_rows = latest_rows[latest_rows['ticker'].isin(tickers)]
+    total_krw_balance, total_coin_balance = get_latest_state(latest_rows)
+    # 모든 티커의 호가를 한 번에 조회합니다 (PRICE_TTL 동안 모든 세션이 공유).
+    ask_prices = market_data.get_ask_prices(tickers + [f"KRW-{coin}" for coin in total_coin_balance], ttl=PRICE_TTL)
+
+    st.write("**티커별 현황**")
+    st.dataframe(build_summary(latest_rows, ask_prices, total_start_value))
 
     st.write("**거래 내역**")
-    st.dataframe(combined_df)
+    st.dataframe(recent)
+
+    # 이전 기록은 요청할 때만 페이지 단위로 읽습니다.
+    older_pages = st.session_state.setdefault('older_pages', [])
+    if st.button("이전 기록 더 보기"):
+        oldest = older_pages[0] if older_pages else recent
+        if not oldest.empty:
+            page = load_older_page(DB_PATH, int(oldest['id'].iloc[0]))
+            if not page.empty:
+                older_pages.insert(0, page)
+    if older_pages:
+        st.write("**이전 거래 내역**")
+        st.dataframe(pd.concat(older_pages, ignore_index=True))
 
     total_current_value = total_krw_balance
     for ticker, coin_balance in total_coin_balance.items():
         if coin_balance > 0:
-            current_price = pyupbit.get_orderbook(f"KRW-{ticker}")['orderbook_units'][0]["ask_price"]
+            current_price = ask_prices[f"KRW-{ticker}"]
             total_current_value += coin_balance * current_price
 
     st.write(f"현재 보유 현금: {total_krw_balance} 원")
@@ -99,4 +163,4 @@ def main():
     st.write(f"전체 현재 가치: {total_current_value} 원")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,22 +1,13 @@
 import logging
-from config import EXCLUDE_COINS
-from data_analysis import get_average_noise_ratio, get_daily_data_based_on_10am
-
-def select_coins(top_coins, n=3):
-    filtered_coins = [coin for coin in top_coins if coin not in EXCLUDE_COINS]
-
-    noise_ratios = [(ticker, get_average_noise_ratio(ticker)) for ticker in filtered_coins]
-    noise_ratios = [nr for nr in noise_ratios if nr[1] is not None]
-    sorted_by_noise = sorted(noise_ratios, key=lambda x: x[1])
-
-    final_selection = []
-    for coin, _ in sorted_by_noise:
-        if is_price_above_ma(coin) and is_volume_above_ma(coin):
-            final_selection.append(coin)
-            if len(final_selection) == n:
-                break
-
-    return final_selection
+from data_analysis import get_daily_data_based_on_10am
+import screening
+from upbit_api import universe
+
+def select_coins(top_coins=None, n=3):
+    # 후보를 주지 않으면 제외 종목이 빠진 전체 KRW 마켓을 대상으로 합니다.
+    filtered_coins = list(universe.tradable()) if top_coins is None else universe.filter(top_coins)
+    # 후보 코인마다 일봉을 한 번만 받아 노이즈/이동평균 조건을 한꺼번에 계산합니다.
+    return screening.select_coins(filtered_coins, n)
 
 def is_price_above_ma(ticker, days=5):
     df = get_daily_data_based_on_10am(ticker, days)
@@ -0,0 +1,121 @@
+import os
+import time
+import logging
+import threading
+import pyupbit
+from scheduler import Scheduler, interval
+
+UNIVERSE_REFRESH = float(os.getenv("UNIVERSE_REFRESH", "60"))  # seconds between market list rescans
+WARNING_STATES = {'CAUTION'}  # Upbit market_warning values that exclude a market
+
+
+def fetch_krw_markets():
+    return pyupbit.get_tickers(fiat="KRW", is_details=True)
+
+
+class Universe:
+    """
+    The tradable KRW markets and the exclusions, as sets. refresh() rescans the market list
+    (on its own schedule once started) and swaps in new sets, so is_excluded() is a set lookup
+    and tradable() a ready-made tuple the screening/valuation code can iterate directly.
+    The first read scans the market list if nothing has yet; with auto_start it also starts
+    the background rescans, so callers never see an empty universe.
+    """
+
+    def __init__(self, static_exclusions=(), fetch=fetch_krw_markets, refresh_interval=UNIVERSE_REFRESH, on_new_exclusions=None,
+                 auto_start=False):
+        self.static_exclusions = frozenset(static_exclusions)
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.on_new_exclusions = on_new_exclusions
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._markets = ()
+        self._warned = frozenset()
+        self._excluded = self.static_exclusions
+        self._tradable = ()
+        self._scheduler = None
+        self.auto_start = auto_start
+        self._start_lock = threading.Lock()
+
+    def refresh(self):
+        """Rescans the KRW markets; returns the markets newly put under warning since the last scan."""
+        details = self.fetch()
+        markets = tuple(item['market'] for item in details)
+        warned = frozenset(item['market'] for item in details if item.get('market_warning') in WARNING_STATES)
+        with self._lock:
+            new_exclusions = sorted(warned - self._warned - self.static_exclusions)
+            self._markets = markets
+            self._warned = warned
+            self._excluded = self.static_exclusions | warned
+            self._tradable = tuple(market for market in markets if market not in self._excluded)
+            self.updated_at = time.time()
+        if new_exclusions and self.on_new_exclusions is not None:
+            self.on_new_exclusions(new_exclusions)
+        return new_exclusions
+
+    def _scheduled_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.error(f"Failed to refresh the market universe: {e}")
+
+    def schedule(self, scheduler, seconds=None):
+        """Adds the periodic rescan to an existing Scheduler."""
+        return scheduler.add_job(self._scheduled_refresh, interval(seconds or self.refresh_interval),
+                                 name="universe", missed='skip', overlap='skip')
+
+    def start(self):
+        """Scans now, then keeps rescanning on a background scheduler of its own."""
+        if self._scheduler is None:
+            self.refresh()
+            self._scheduler = Scheduler(max_workers=1)
+            self.schedule(self._scheduler)
+            threading.Thread(target=self._scheduler.run_forever, name="universe", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.stop()
+            self._scheduler = None
+
+    def _ensure_loaded(self, required=True):
+        """Scans once (and starts the rescans with auto_start) if no scan has succeeded yet."""
+        if self.updated_at is not None:
+            return
+        with self._start_lock:
+            if self.updated_at is not None:
+                return
+            try:
+                if self.auto_start and self._scheduler is None:
+                    self.start()
+                else:
+                    self.refresh()
+            except Exception as e:
+                if required:
+                    raise
+                # Exclusion checks fall back to the configured list until a scan succeeds
+                logging.error(f"Failed to load the market universe, using the configured exclusions only: {e}")
+
+    def is_excluded(self, ticker):
+        self._ensure_loaded(required=False)
+        return ticker in self._excluded
+
+    @property
+    def excluded(self):
+        self._ensure_loaded(required=False)
+        return self._excluded
+
+    def markets(self):
+        self._ensure_loaded()
+        return self._markets
+
+    def tradable(self):
+        """All KRW markets not excluded, in listing order."""
+        self._ensure_loaded()
+        return self._tradable
+
+    def filter(self, tickers):
+        self._ensure_loaded(required=False)
+        excluded = self._excluded
+        return [ticker for ticker in tickers if ticker not in excluded]
@@ -4,49 +4,59 @@ import datetime
 from config import UPBIT_ACCESS_KEY, UPBIT_SECRET_KEY, EXCLUDE_COINS
 from slack_bot import send_slack_message
 from utils import log_trade
+from account_snapshot import AccountSnapshot
+from order_tracker import OrderTracker
+from valuation import Portfolio
+import market_data
+from universe import Universe
 
 # PyUpbit 초기화
 upbit = pyupbit.Upbit(UPBIT_ACCESS_KEY, UPBIT_SECRET_KEY)
+# 잔액/현재가 스냅샷: 주문이 체결된 뒤 또는 60초가 지나면 다시 조회합니다.
+account = AccountSnapshot(upbit, max_age=60)
+order_tracker = OrderTracker(upbit, max_workers=2)
 
 def get_balance(currency):
-    balances = upbit.get_balances()
-    for balance in balances:
-        if balance['currency'] == currency:
-            return float(balance['balance'])
-    return 0
+    return account.balance(currency)
 
 def get_current_price(ticker):
     try:
-        return pyupbit.get_current_price(ticker)
+        return market_data.get_current_price(ticker)
     except pyupbit.errors.UpbitError as e:
         logging.error(f"Failed to get current price for {ticker}: {e}")
         send_slack_message("#ms-upbit", f"현재 가격 조회 실패: {ticker}")
         return None
 
 def get_coin_value_in_krw(ticker):
-    balance = get_balance(ticker.replace('KRW-', ''))
-    current_price = get_current_price(ticker)
-    return balance * current_price
+    coin = ticker.replace('KRW-', '')
+    current_price = account.price(coin)
+    if current_price is None:
+        current_price = get_current_price(ticker)
+    return get_balance(coin) * current_price
+
+def get_portfolio():
+    # 제외 종목을 뺀 보유 코인을 수량/현재가 배열로 한 번에 평가합니다.
+    coins = [balance['currency'] for balance in account.balances()
+             if balance['currency'] != 'KRW' and not universe.is_excluded(f"KRW-{balance['currency']}")]
+    return Portfolio.from_account(account, coins)
 
 def get_total_investment_amount():
-    balances = upbit.get_balances()
-    total_krw_value_of_coins = 0
-    for balance in balances:
-        ticker = f"KRW-{balance['currency']}"
-        if balance['currency'] != 'KRW' and ticker not in EXCLUDE_COINS:
-            current_price = get_current_price(ticker)
-            if current_price is not None:
-                total_krw_value_of_coins += float(balance['balance']) * current_price
-    krw_balance = next((float(balance['balance']) for balance in balances if balance['currency'] == 'KRW'), 0)
-    total_investment_amount = (krw_balance + total_krw_value_of_coins) * 0.10 # 10% of total assets
+    total_investment_amount = get_portfolio().total * 0.10 # 10% of total assets
     return total_investment_amount
 
+def refresh_after_fill(response):
+    # 주문 직후가 아니라 체결된 뒤에 잔액 스냅샷을 다시 불러오도록 체결을 백그라운드에서 추적합니다.
+    if isinstance(response, dict) and response.get('uuid'):
+        return order_tracker.track(response['uuid'], on_fill=lambda fill: account.invalidate())
+    return None
+
 def execute_trade(coin, action, investment_amount=None):
     krw_balance_before = get_balance("KRW")
     fee_krw = 0
     if action == "buy" and investment_amount is not None and investment_amount >= 5000:
         try:
             buy_response = upbit.buy_market_order(coin, investment_amount)
+            refresh_after_fill(buy_response)
             if 'reserved_fee' in buy_response:
                 fee_krw += float(buy_response['reserved_fee'])
             if buy_response is not None:
@@ -63,6 +73,7 @@ def execute_trade(coin, action, investment_amount=None):
         coin_value_in_krw = get_coin_value_in_krw(coin)
         if coin_value_in_krw >= 5000:
             sell_response = upbit.sell_market_order(coin, get_balance(coin.replace('KRW-', '')))
+            refresh_after_fill(sell_response)
             if 'reserved_fee' in sell_response:
                 fee_krw = float(sell_response['reserved_fee'])
             if sell_response is not None:
@@ -77,25 +88,22 @@ def execute_trade(coin, action, investment_amount=None):
             send_slack_message("#ms-upbit", f"{coin} 매도 불가: 보유 코인 원화 환산 가치 미달.")
     return fee_krw
 
-def update_excluded_coins_and_notify():
-    global EXCLUDE_COINS
-    tickers = pyupbit.get_tickers(fiat="KRW", is_details=True)
-    new_exclusions = []
+def notify_new_exclusions(new_exclusions):
+    message = f"유의 종목 지정코인 투자 제외: {', '.join(new_exclusions)}"
+    send_slack_message("#ms-upbit", message)
 
-    for ticker in tickers:
-        if ticker['market_warning'] == 'CAUTION' and ticker['market'] not in EXCLUDE_COINS:
-            new_exclusions.append(ticker['market'])
-            EXCLUDE_COINS.append(ticker['market'])
+# 거래 대상 KRW 마켓과 제외 목록(set): 처음 사용할 때 조회하고, 이후 백그라운드에서 주기적으로 다시 조회합니다.
+universe = Universe(EXCLUDE_COINS, on_new_exclusions=notify_new_exclusions, auto_start=True)
 
-    if new_exclusions:
-        message = f"유의 종목 지정코인 투자 제외: {', '.join(new_exclusions)}"
-        send_slack_message("#ms-upbit", message)
-    else:
+def update_excluded_coins_and_notify():
+    new_exclusions = universe.refresh()
+    if not new_exclusions:
         print("새로운 유의 종목 없음")
+    return new_exclusions
 
 def summarize_holdings():
-    balances = upbit.get_balances()
+    balances = account.balances()
     krw_balance = get_balance("KRW")
-    holdings = {balance['currency']: float(balance['balance']) for balance in balances if balance['currency'] != 'KRW' and f"KRW-{balance['currency']}" not in EXCLUDE_COINS}
+    holdings = {balance['currency']: float(balance['balance']) for balance in balances if balance['currency'] != 'KRW' and not universe.is_excluded(f"KRW-{balance['currency']}")}
     holdings_summary = ", ".join([f"{coin}: {amount} 코인" for coin, amount in holdings.items()])
     return holdings_summary, krw_balance
\ No newline at end of file
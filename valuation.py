@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class Portfolio:
+    """
+    Holdings as aligned arrays: coins[i] is held in quantities[i] at prices[i] KRW.
+    Totals, per-coin values, weights and drift from target ratios are single array
+    expressions; update_prices() revalues only the coins whose price changed.
+    A coin without a price is valued at 0, like AccountSnapshot.coin_value.
+    """
+
+    def __init__(self, coins, quantities, prices, krw=0.0):
+        self.coins = list(coins)
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        self.quantities = np.asarray(quantities, dtype=float)
+        self.prices = np.array([np.nan if price is None else price for price in prices], dtype=float)
+        self.krw = float(krw)
+        self.revalue()
+
+    @classmethod
+    def from_account(cls, account, coins=None):
+        """Builds from an AccountSnapshot's cached balances and prices (coins defaults to every non-KRW balance)."""
+        if coins is None:
+            coins = [b['currency'] for b in account.balances() if b['currency'] != 'KRW']
+        return cls(coins, [account.balance(coin) for coin in coins], [account.price(coin) for coin in coins], account.balance('KRW'))
+
+    def revalue(self):
+        """Recomputes every value from scratch."""
+        self.values = np.nan_to_num(self.quantities * self.prices)
+        self.coin_total = float(self.values.sum())
+
+    def update_prices(self, prices):
+        """Revalues just the coins in `prices` ({coin: price}); unknown coins are ignored."""
+        positions = [self.index[coin] for coin in prices if coin in self.index]
+        if not positions:
+            return
+        positions = np.array(positions)
+        self.prices[positions] = [prices[self.coins[i]] for i in positions]
+        values = np.nan_to_num(self.quantities[positions] * self.prices[positions])
+        self.coin_total += float(values.sum() - self.values[positions].sum())
+        self.values[positions] = values
+
+    def update_quantity(self, coin, quantity):
+        i = self.index[coin]
+        self.quantities[i] = quantity
+        value = 0.0 if np.isnan(self.prices[i]) else quantity * self.prices[i]
+        self.coin_total += value - self.values[i]
+        self.values[i] = value
+
+    def missing_prices(self):
+        """Coins whose price is unknown; their holdings are valued at 0 until a price arrives."""
+        return [coin for coin, price in zip(self.coins, self.prices) if np.isnan(price)]
+
+    @property
+    def total(self):
+        return self.krw + self.coin_total
+
+    def quantity(self, coin):
+        i = self.index.get(coin)
+        return 0.0 if i is None else float(self.quantities[i])
+
+    def value(self, coin):
+        i = self.index.get(coin)
+        return 0.0 if i is None else float(self.values[i])
+
+    def weights(self):
+        """Each coin's share of the total (KRW included in the denominator)."""
+        total = self.total
+        return self.values / total if total > 0 else np.zeros(len(self.coins))
+
+    def target_array(self, targets):
+        """{coin: ratio} aligned to self.coins; coins without a target get 0."""
+        return np.array([targets.get(coin, 0.0) for coin in self.coins], dtype=float)
+
+    def drift(self, targets):
+        """Current weight minus target ratio per coin (positive: overweight)."""
+        return self.weights() - self.target_array(targets)
+
+    def shortfall(self, targets):
+        """KRW needed to bring each coin up to its target ratio of the total (negative: above target)."""
+        return dict(zip(self.coins, (self.target_array(targets) * self.total - self.values).tolist()))
@@ -0,0 +1,194 @@
+"""
+Upbit WebSocket market-data subscriber.
+Keeps one connection open for ticker, orderbook and trade streams and maintains an in-memory
+latest-price / top-of-book table plus candles built from trades. market_data reads from the
+attached feed first and only falls back to REST for tickers whose entries are missing or stale.
+
+    MARKET_FEED=websocket python autotrade_v2.py
+    MARKET_FEED_URL=ws://127.0.0.1:8766 ...   # ws_standin.py replay
+"""
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+
+try:
+    from websockets.sync.client import connect
+    from websockets.exceptions import WebSocketException
+except ImportError:
+    connect = None
+    WebSocketException = Exception
+
+MARKET_FEED = os.getenv("MARKET_FEED", "rest")  # "websocket" starts a feed in the entry points
+MARKET_FEED_URL = os.getenv("MARKET_FEED_URL", "wss://api.upbit.com/websocket/v1")
+# Seconds after which a table entry is treated as missing; also the silence that forces a reconnect
+FEED_STALE_AFTER = float(os.getenv("FEED_STALE_AFTER", "10"))
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+MAX_BARS = 500
+
+KST = timezone(timedelta(hours=9))
+# Upbit candles are aligned on UTC, and pyupbit indexes them by their KST start time
+CANDLE_INTERVALS = {'minute1': 1, 'minute3': 3, 'minute5': 5, 'minute10': 10, 'minute15': 15,
+                    'minute30': 30, 'minute60': 60, 'minute240': 240, 'day': 1440}
+
+
+class CandleBuilder:
+    """Aggregates trades into OHLCV bars for one ticker and interval."""
+
+    def __init__(self, interval, max_bars=MAX_BARS):
+        self.interval = interval
+        self.bar_ms = CANDLE_INTERVALS[interval] * 60 * 1000
+        self.max_bars = max_bars
+        self.bars = OrderedDict()  # bar start (epoch ms) -> [open, high, low, close, volume, value]
+
+    def add_trade(self, timestamp_ms, price, volume):
+        start = timestamp_ms - timestamp_ms % self.bar_ms
+        bar = self.bars.get(start)
+        if bar is None:
+            if self.bars and start < next(reversed(self.bars)):
+                return  # late trade for a bar we no longer track
+            self.bars[start] = [price, price, price, price, volume, price * volume]
+            while len(self.bars) > self.max_bars:
+                self.bars.popitem(last=False)
+            return
+        bar[1] = max(bar[1], price)
+        bar[2] = min(bar[2], price)
+        bar[3] = price
+        bar[4] += volume
+        bar[5] += price * volume
+
+    def reset(self):
+        self.bars.clear()
+
+    def to_frame(self):
+        """Bars as a pyupbit.get_ohlcv-shaped DataFrame; the first bar is partial (the feed joined mid-bar)."""
+        index = pd.DatetimeIndex([datetime.fromtimestamp(start / 1000, KST).replace(tzinfo=None) for start in self.bars])
+        return pd.DataFrame(list(self.bars.values()), index=index, columns=['open', 'high', 'low', 'close', 'volume', 'value'])
+
+
+class MarketFeed:
+    def __init__(self, tickers, url=MARKET_FEED_URL, stale_after=FEED_STALE_AFTER, candle_intervals=('minute60', 'day')):
+        if connect is None:
+            raise RuntimeError("The websockets package is required for the market feed")
+        self.tickers = list(tickers)
+        self.url = url
+        self.stale_after = stale_after
+        self.connected = False
+        self.reconnects = 0
+        self.last_message_at = None
+        self._prices = {}  # ticker -> (received_at, trade_price)
+        self._orderbooks = {}  # ticker -> (received_at, orderbook)
+        self._candles = {(ticker, interval): CandleBuilder(interval) for ticker in self.tickers for interval in candle_intervals}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="market-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _subscription(self):
+        codes = self.tickers
+        return json.dumps([
+            {"ticket": str(uuid.uuid4())},
+            {"type": "ticker", "codes": codes},
+            {"type": "orderbook", "codes": codes},
+            {"type": "trade", "codes": codes},
+            {"format": "DEFAULT"},
+        ])
+
+    def _run(self):
+        delay = RECONNECT_MIN_DELAY
+        while not self._stop.is_set():
+            try:
+                with connect(self.url, open_timeout=10, close_timeout=1, max_size=2 ** 22) as ws:
+                    ws.send(self._subscription())
+                    self.connected = True
+                    print(f"Market feed connected to {self.url}")
+                    while not self._stop.is_set():
+                        # No message within the staleness window means the connection is dead; reconnect
+                        message = ws.recv(timeout=self.stale_after)
+                        self._handle(json.loads(message))
+                        delay = RECONNECT_MIN_DELAY
+            except (OSError, TimeoutError, WebSocketException, ValueError) as e:
+                if self._stop.is_set():
+                    break
+                print(f"Market feed disconnected ({type(e).__name__}: {e}); reconnecting in {delay:.0f}s")
+            finally:
+                self.connected = False
+                # Trades during the outage are lost, so the current bars are incomplete. Drop them:
+                # after reconnecting, the first bar is partial again and candle_store uses REST until
+                # the store has caught up past it.
+                self._reset_candles()
+            self.reconnects += 1
+            # Exponential backoff with jitter so restarts don't reconnect in lockstep
+            self._stop.wait(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _reset_candles(self):
+        with self._lock:
+            for builder in self._candles.values():
+                builder.reset()
+
+    def _handle(self, message):
+        now = time.monotonic()
+        self.last_message_at = now
+        kind = message.get('type')
+        ticker = message.get('code')
+        with self._lock:
+            if kind == 'ticker':
+                self._prices[ticker] = (now, message['trade_price'])
+            elif kind == 'orderbook':
+                self._orderbooks[ticker] = (now, {
+                    'market': ticker,
+                    'timestamp': message.get('timestamp'),
+                    'total_ask_size': message.get('total_ask_size'),
+                    'total_bid_size': message.get('total_bid_size'),
+                    'orderbook_units': message.get('orderbook_units', []),
+                })
+            elif kind == 'trade':
+                self._prices[ticker] = (now, message['trade_price'])
+                for (code, _), builder in self._candles.items():
+                    if code == ticker:
+                        builder.add_trade(message['trade_timestamp'], message['trade_price'], message['trade_volume'])
+
+    def _fresh(self, table, tickers):
+        now = time.monotonic()
+        with self._lock:
+            return {t: table[t][1] for t in tickers if t in table and now - table[t][0] < self.stale_after}
+
+    def get_prices(self, tickers):
+        """{ticker: trade_price} for tickers with a fresh entry; stale or unknown tickers are omitted."""
+        return self._fresh(self._prices, tickers)
+
+    def get_orderbooks(self, tickers):
+        return self._fresh(self._orderbooks, tickers)
+
+    def get_candles(self, ticker, interval):
+        """Bars built from trades since the feed (re)connected, or None if the interval is not tracked or the feed is down."""
+        builder = self._candles.get((ticker, interval))
+        if builder is None or not self.connected or self.is_stale():
+            return None
+        with self._lock:
+            return builder.to_frame()
+
+    def is_stale(self):
+        return self.last_message_at is None or time.monotonic() - self.last_message_at >= self.stale_after
+
+
+def start_feed(tickers, url=MARKET_FEED_URL):
+    """Starts a feed and attaches it to market_data (and, through it, candle_store)."""
+    import market_data
+    feed = MarketFeed(tickers, url=url).start()
+    market_data.attach_feed(feed)
+    return feed
@@ -0,0 +1,104 @@
+"""
+Local stand-in for the Upbit WebSocket feed, for tests and offline runs.
+Replays a recorded JSONL capture (one message per line) or, without one, streams a synthetic
+random walk of ticker/orderbook/trade messages for the subscribed codes:
+
+    python ws_standin.py --record capture.jsonl --seconds 600      # capture the real feed
+    python ws_standin.py --replay capture.jsonl --speed 10          # replay it 10x faster
+    MARKET_FEED=websocket MARKET_FEED_URL=ws://127.0.0.1:8766 python autotrade_v2.py --mode test
+"""
+import json
+import time
+import random
+import argparse
+from websockets.sync.client import connect
+from websockets.sync.server import serve
+from websockets.exceptions import ConnectionClosed
+
+import ws_feed
+
+SYNTHETIC_START_PRICES = {"KRW-BTC": 90000000.0, "KRW-SOL": 200000.0, "KRW-XRP": 800.0}
+
+
+def _subscribed_codes(subscription):
+    codes = set()
+    for field in json.loads(subscription):
+        codes.update(field.get('codes', []))
+    return codes
+
+
+def synthetic_messages(codes, interval=0.2, volatility=0.001):
+    prices = {code: SYNTHETIC_START_PRICES.get(code, 1000.0) for code in codes}
+    while True:
+        now = int(time.time() * 1000)
+        for code in codes:
+            price = prices[code] = prices[code] * (1 + random.gauss(0, volatility))
+            volume = random.uniform(0.001, 1.0)
+            yield {"type": "trade", "code": code, "trade_price": price, "trade_volume": volume,
+                   "trade_timestamp": now, "ask_bid": random.choice(["ASK", "BID"])}
+            yield {"type": "ticker", "code": code, "trade_price": price, "timestamp": now}
+            units = [{"ask_price": price * (1 + 0.0005 * (i + 1)), "bid_price": price * (1 - 0.0005 * (i + 1)),
+                      "ask_size": random.uniform(0.1, 5), "bid_size": random.uniform(0.1, 5)} for i in range(15)]
+            yield {"type": "orderbook", "code": code, "timestamp": now, "orderbook_units": units,
+                   "total_ask_size": sum(u["ask_size"] for u in units), "total_bid_size": sum(u["bid_size"] for u in units)}
+        time.sleep(interval)
+
+
+def replay_messages(path, speed=1.0):
+    previous = None
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            message = json.loads(line)
+            stamp = message.get('trade_timestamp') or message.get('timestamp')
+            if previous is not None and stamp is not None and speed > 0:
+                time.sleep(max(stamp - previous, 0) / 1000 / speed)
+            previous = stamp if stamp is not None else previous
+            yield message
+
+
+def serve_feed(host="127.0.0.1", port=8766, replay_path=None, speed=1.0, interval=0.2):
+    def handler(websocket):
+        codes = _subscribed_codes(websocket.recv())
+        messages = replay_messages(replay_path, speed) if replay_path else synthetic_messages(sorted(codes), interval)
+        try:
+            for message in messages:
+                if message.get('code') in codes:
+                    websocket.send(json.dumps(message).encode('utf-8'))
+        except ConnectionClosed:
+            pass
+
+    server = serve(handler, host, port)
+    source = replay_path or "synthetic random walk"
+    print(f"WebSocket stand-in listening on ws://{host}:{port} ({source})")
+    return server
+
+
+def record(path, tickers, seconds, url=ws_feed.MARKET_FEED_URL):
+    """Captures the real feed into a JSONL file usable with --replay."""
+    feed = ws_feed.MarketFeed(tickers, url=url)
+    deadline = time.monotonic() + seconds
+    count = 0
+    with connect(url) as websocket, open(path, "w", encoding="utf-8") as file:
+        websocket.send(feed._subscription())
+        while time.monotonic() < deadline:
+            file.write(json.dumps(json.loads(websocket.recv())) + "\n")
+            count += 1
+    print(f"Recorded {count} messages to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='로컬 웹소켓 시세 대체 서버')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--replay', type=str, default=None, help='재생할 JSONL 캡처 파일 (없으면 무작위 시세 생성)')
+    parser.add_argument('--speed', type=float, default=1.0, help='재생 배속 (0이면 대기 없이 재생)')
+    parser.add_argument('--interval', type=float, default=0.2, help='무작위 시세 생성 간격 (초)')
+    parser.add_argument('--record', type=str, default=None, help='실제 시세를 JSONL 파일로 저장')
+    parser.add_argument('--seconds', type=float, default=60, help='저장 시간 (초)')
+    parser.add_argument('--tickers', type=str, default="KRW-BTC,KRW-SOL,KRW-XRP")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.tickers.split(','), args.seconds)
+    else:
+        serve_feed(args.host, args.port, args.replay, args.speed, args.interval).serve_forever()